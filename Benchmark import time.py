@@ -0,0 +1,90 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Benchmark import time.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Catch import-time regressions of the analysis and plotting
+##              modules. Every case is run in a fresh interpreter:
+##              1. The time above a bare interpreter start must be within
+##                 its budget.
+##              2. Heavy modules the case does not need (pandas, pyplot,
+##                 scipy, ...) must not have been imported.
+##              Usage: python "Benchmark import time.py" [--repeat N] [--budget-factor F]
+##              Exits with 1 if any case fails.
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+CV_PATH = os.path.join(CURRENT_PATH, "CV curves")
+WORKBOOK_PATH = os.path.join(CURRENT_PATH, "Raw data", "Fuel cell lab 121222 Data.xlsx")
+
+# (name, folder, code, budget in ms above a bare interpreter, modules that must not be imported)
+CASES = [
+    ("functions.cm_2_inch",  CV_PATH, "import functions; functions.cm_2_inch(16)", 30,  ["numpy", "pandas", "matplotlib"]),
+    ("import CSV_handler",   CV_PATH, "import CSV_handler",                        60,  ["numpy", "pandas", "matplotlib"]),
+    ("import cache_handler", CV_PATH, "import cache_handler",                      60,  ["numpy", "pandas"]),
+    ("import Excel_handler", CV_PATH, "import Excel_handler",                      30,  ["numpy", "pandas", "openpyxl"]),
+    ("import CV_analysis",   CV_PATH, "import CV_analysis",                        300, ["pandas", "scipy", "matplotlib"]),
+    ("import figure_spec",   CV_PATH, "import figure_spec",                        80,  ["numpy", "pandas", "matplotlib"]),
+    ("ECSA, compute only",   CV_PATH,
+        "import runpy; ecsa = runpy.run_path('Fuel Cell CV-ECSA lab code.py', run_name='ecsa'); "
+        f"ecsa['calculate_ecsa_auto']({WORKBOOK_PATH!r}, 'CV fresh', 0.0005, 4, 2.1)",
+        3000, ["matplotlib", "matplotlib.pyplot", "scipy"]),
+]
+
+CHECK_MODULES = "import sys, json; print(json.dumps(sorted(m for m in {modules!r} if m in sys.modules)))"
+
+
+# FUNCTIONS #
+def run_case(folder, code, forbidden_modules):
+    """Runs code in a fresh interpreter in folder. Returns (wall time in seconds, forbidden modules that got imported)"""
+    start_time = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code + "\n" + CHECK_MODULES.format(modules=forbidden_modules)],
+                            cwd=folder, capture_output=True, text=True, check=True).stdout
+    wall_time = time.perf_counter() - start_time
+    return wall_time, json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark(repeat=5, budget_factor=1.0):
+    """Runs every case repeat times, prints a table of the fastest times and returns the number of failed cases"""
+    baseline = min(run_case(CURRENT_PATH, "pass", [])[0] for _ in range(repeat))
+    print(f"Bare interpreter: {baseline*1000:.1f} ms\n")
+    print(f"{'case':<24} {'time / ms':>10} {'budget / ms':>12}  result")
+
+    number_failed = 0
+    for name, folder, code, budget, forbidden_modules in CASES:
+        runs = [run_case(folder, code, forbidden_modules) for _ in range(repeat)]
+        case_time = (min(wall_time for wall_time, _ in runs) - baseline) * 1000
+        imported = sorted(set(module for _, modules in runs for module in modules))
+
+        problems = []
+        if case_time > budget * budget_factor:
+            problems.append("over budget")
+        if imported:
+            problems.append("imported " + ", ".join(imported))
+        number_failed += bool(problems)
+
+        print(f"{name:<24} {case_time:>10.1f} {budget*budget_factor:>12.0f}  {'; '.join(problems) if problems else 'ok'}")
+
+    return number_failed
+
+
+# MAIN #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the analysis and plotting modules.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the fastest is used (default 5)")
+    parser.add_argument("--budget-factor", type=float, default=1.0, help="scales every budget, e.g. 2 on a slow machine (default 1)")
+    arguments = parser.parse_args()
+
+    sys.exit(1 if benchmark(arguments.repeat, arguments.budget_factor) else 0)
@@ -0,0 +1,358 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Benchmark suite.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Time and memory of the data paths of the lab code on
+##              synthetic data of any size.
+##              1. Generate deterministic synthetic CV and polarization
+##                 data (CSV-files and single- and multi-sheet workbooks)
+##                 once per size and seed, kept in the data directory.
+##              2. Run every case in a fresh interpreter with an empty
+##                 cache and measure the time of the operation and the
+##                 growth of the peak memory (RSS) it causes.
+##              3. Save the results as JSON, named by the git commit, and
+##                 compare them with the results of another commit.
+##              Usage: python "Benchmark suite.py" [--sizes 1e4 1e5 1e6]
+##                     [--repeat N] [--cases read ...] [--compare FILE]
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import platform
+import tempfile
+import subprocess
+# numpy is imported in the functions that generate data, openpyxl in write_workbook
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+CV_PATH = os.path.join(CURRENT_PATH, "CV curves")
+RESULTS_PATH = os.path.join(CURRENT_PATH, "Benchmark results")
+DATA_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "TIF351_benchmark_data") # next to the cache, not in it: cache_handler.clear removes the whole cache
+
+DEFAULT_SIZES = [10**4, 10**5, 10**6] # up to 10**8 with --sizes, the CSV-files are then a few GB
+EXCEL_MAX_SAMPLES = 10**6             # an Excel-sheet has at most 1048576 rows, larger sizes skip the workbook cases
+MULTI_SHEET_NAMES = ['CV aged', 'CV fresh', 'CV 3', 'CV 4']
+GENERATE_BLOCK_SAMPLES = 2**20        # samples generated and written at a time, so any size fits in memory
+SEED = 351
+
+CV_SAMPLES_PER_CYCLE = 2000
+POLARIZATION_DWELL_SAMPLES = 10       # samples at every 1 mV potential step
+ELECTRODE_AREA = 5                    # cm^2, as in the polarization spec
+
+# (name, dataset, setup code, timed code), run in CV_PATH with the dataset paths as variables.
+# The setup imports the modules the code imports lazily, so that their import time is not measured
+CASES = [
+    ("read",                     "CSV",
+        "import CSV_handler as CSV, pandas",
+        "CSV.read(CV_CSV, print_message=False, use_cache=False)"),
+    ("read, cached",             "CSV",
+        "import CSV_handler as CSV; CSV.read(CV_CSV, print_message=False)",
+        "CSV.read(CV_CSV, print_message=False)"),
+    ("print_arrays_to_CSV",      "CSV",
+        "import CSV_handler as CSV; data = CSV.read(CV_CSV, print_message=False, use_cache=False); arrays = [data.iloc[:, j].to_numpy() for j in range(data.shape[1])]",
+        "CSV.print_arrays_to_CSV(OUTPUT_CSV, 'Potential (V)', arrays[0], 'Current (mA)', arrays[1])"),
+    ("combine_CSV_files_to_one", "CSV",
+        "import CSV_handler as CSV, pandas",
+        "CSV.combine_CSV_files_to_one(OUTPUT_CSV, [CV_CSV, POLARIZATION_CSV])"),
+    ("calculate_ecsa",           "single-sheet",
+        "import runpy, pandas, openpyxl; ecsa = runpy.run_path('Fuel Cell CV-ECSA lab code.py', run_name='benchmark')",
+        "ecsa['calculate_ecsa'](WORKBOOK, 'CV fresh')"),
+    ("load_sheets",              "multi-sheet",
+        "import runpy, pandas, openpyxl; ecsa = runpy.run_path('Fuel Cell CV-ECSA lab code.py', run_name='benchmark')",
+        f"ecsa['load_sheets'](WORKBOOK, {MULTI_SHEET_NAMES!r})"),
+    ("plot_and_calculate_ecsa",  "single-sheet",
+        "import runpy, scipy.integrate, matplotlib.pyplot as plt, pandas, openpyxl; ecsa = runpy.run_path('Fuel Cell CV-ECSA lab code.py', run_name='benchmark')",
+        "ecsa['plot_and_calculate_ecsa'](WORKBOOK, 'CV fresh', 0.0005, 4, 2.1, (0, 0.5)); plt.gcf().canvas.draw(); plt.close('all')"), # drawn as plt.show would, which does nothing with Agg
+    ("figure export",            "CSV",
+        "import figure_spec, matplotlib.pyplot, pandas",
+        "figure_spec.build_figure(SPEC, force=True)"),
+    ("figure export, latex",     "CSV",
+        "import figure_spec, matplotlib.pyplot, pandas",
+        "figure_spec.build_figure(SPEC_LATEX, force=True)"),
+    ("text rendering, mathtext", "CSV",
+        "import figure_spec, functions; spec = figure_spec.load_spec(SPEC); spec['text_mode'] = 'mathtext'; fig = figure_spec.plot_figure(spec, spec['CSV'])",
+        "functions.time_text_rendering(fig)"),
+    ("text rendering, latex",    "CSV",
+        "import figure_spec, functions; spec = figure_spec.load_spec(SPEC); spec['text_mode'] = 'latex'; fig = figure_spec.plot_figure(spec, spec['CSV'])",
+        "functions.time_text_rendering(fig)"),
+]
+# cases that need a LaTeX installation, skipped without one. The first run fills matplotlib's tex.cache, the fastest run is from it
+LATEX_CASES = ["figure export, latex", "text rendering, latex"]
+
+CHILD_TEMPLATE = """
+import os, sys, json, time
+sys.path.insert(0, os.getcwd())
+{variables}
+{setup}
+def get_memory():
+    # (current, peak) resident memory in bytes. On Linux the peak (VmHWM) is reset first, ru_maxrss would keep the peak of the parent process
+    try:
+        with open('/proc/self/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+        return int(fields['VmRSS'].split()[0]) * 1024, int(fields['VmHWM'].split()[0]) * 1024
+    except OSError:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+            return peak, peak
+        except ImportError: # Windows
+            return None, None
+try:
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+except OSError:
+    pass
+memory_before, _ = get_memory()
+start_time = time.perf_counter()
+{operation}
+wall_time = time.perf_counter() - start_time
+_, peak_memory = get_memory()
+print(json.dumps({{"time": wall_time, "peak_memory": None if peak_memory is None else max(0, peak_memory - memory_before)}}))
+"""
+
+
+# FUNCTIONS #
+def generate_CV_block(block_start, block_stop, seed=SEED):
+    """Synthetic cyclic voltammogram of samples block_start to block_stop: triangular sweeps between 0.05 and 1.0 V with a
+    double-layer current, hydrogen adsorption/desorption peaks, Pt oxide and noise. Returns (potential in V, current in mA).
+    Every sample only depends on its index and the seed, so any block of any size gives the same samples"""
+    import numpy as np
+
+    index = np.arange(block_start, block_stop)
+    phase = (index % CV_SAMPLES_PER_CYCLE) / CV_SAMPLES_PER_CYCLE
+    direction = np.where(phase < 0.5, 1.0, -1.0)
+    potential = 0.05 + 0.95 * (1 - np.abs(2 * phase - 1))
+
+    hydrogen = 8 * np.exp(-((potential - 0.12) / 0.03)**2) + 6 * np.exp(-((potential - 0.27) / 0.04)**2)
+    oxide = np.where(direction > 0, 10, -14) * np.clip((potential - 0.8) / 0.2, 0, None)**2
+    current = direction * (4 + hydrogen) + oxide
+
+    rng = np.random.default_rng([seed, block_start])
+    current += rng.normal(0, 0.05, len(index))
+    return np.round(potential, 5), np.round(current, 4)
+
+
+def get_polarization_current(potential, exchange_current, ASR, limiting_current):
+    """Current density in mA cm^-2 of the activation, ohmic and mass-transport loss model at potential (V), by interpolation"""
+    import numpy as np
+
+    current_grid = np.linspace(1e-3, 0.999 * limiting_current, 4000)
+    potential_grid = 1.229 - 0.045 * np.log10(current_grid / exchange_current) - ASR * current_grid / 1000 + 0.03 * np.log(1 - current_grid / limiting_current)
+    return np.interp(potential, potential_grid[::-1], current_grid[::-1])
+
+
+def generate_polarization_block(block_start, block_stop, seed=SEED):
+    """Synthetic polarization curves of samples block_start to block_stop, in the layout of the lab CSV-file: potential steps
+    of 1 mV between 1.0 and 0.5 V and back, POLARIZATION_DWELL_SAMPLES samples per step, current in mA (negative when the cell
+    delivers current) for a fresh and an aged cell with noise, and two start-up spikes in the first samples.
+    Returns (fresh current, fresh potential, aged current, aged potential)"""
+    import numpy as np
+
+    index = np.arange(block_start, block_stop)
+    step = (index // POLARIZATION_DWELL_SAMPLES) % 1000
+    potential = np.round(np.where(step < 500, 1.0 - 0.001 * step, 0.5 + 0.001 * (step - 500)), 3)
+
+    rng = np.random.default_rng([seed, block_start])
+    fresh_current = -ELECTRODE_AREA * get_polarization_current(potential, 1e-7, 0.28, 1000) + rng.normal(0, 0.5, len(index))
+    aged_current = -ELECTRODE_AREA * get_polarization_current(potential, 5e-8, 0.30, 850) + rng.normal(0, 0.5, len(index))
+    fresh_current[index == 0], fresh_current[index == 1] = 725, 180
+    return np.round(fresh_current, 3), potential, np.round(aged_current, 3), potential
+
+
+def write_CSV_in_blocks(path, headers, generate_block, number_of_samples, lengths=None):
+    """Writes the columns returned by generate_block(block_start, block_stop) to a CSV-file, one block at a time.
+    Column j is cut at lengths[j] samples (default None, all columns number_of_samples long), like a shorter column in the lab files"""
+    lengths = lengths or [number_of_samples] * len(headers)
+    with open(path + ".part", 'w', encoding='utf-8', buffering=2**20) as CSV_file:
+        CSV_file.write(",".join(headers) + "\n")
+        for block_start in range(0, number_of_samples, GENERATE_BLOCK_SAMPLES):
+            block_stop = min(block_start + GENERATE_BLOCK_SAMPLES, number_of_samples)
+            columns = []
+            for column, length in zip(generate_block(block_start, block_stop), lengths):
+                strings = column[:max(0, length - block_start)].astype(str).tolist()
+                columns.append(strings + [""] * (block_stop - block_start - len(strings)))
+            CSV_file.write("\n".join(map(",".join, zip(*columns))) + "\n")
+    os.replace(path + ".part", path)
+
+
+def write_workbook(path, sheets):
+    """Writes a workbook with a sheet of (potential, current) of every (sheet name, number of samples) in sheets, streamed in write-only mode"""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_index, (sheet_name, number_of_samples) in enumerate(sheets):
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(["Potential (V)", "Current (mA)"])
+        for block_start in range(0, number_of_samples, GENERATE_BLOCK_SAMPLES):
+            potential, current = generate_CV_block(block_start, min(block_start + GENERATE_BLOCK_SAMPLES, number_of_samples), seed=SEED + sheet_index)
+            for row in zip(potential.tolist(), current.tolist()):
+                sheet.append(row)
+    workbook.save(path + ".part")
+    os.replace(path + ".part", path)
+
+
+def get_datasets(number_of_samples, data_directory=DATA_DIRECTORY):
+    """Returns the paths of the synthetic datasets of a size, generating the ones that do not exist yet. Workbooks are only made up to EXCEL_MAX_SAMPLES"""
+    folder = os.path.join(data_directory, f"{number_of_samples}_samples_seed_{SEED}")
+    os.makedirs(folder, exist_ok=True)
+    paths = {
+        "CV_CSV":           os.path.join(folder, "CV.csv"),
+        "POLARIZATION_CSV": os.path.join(folder, "polarization.csv"),
+        "SINGLE_WORKBOOK":  os.path.join(folder, "CV single-sheet.xlsx") if number_of_samples <= EXCEL_MAX_SAMPLES else None,
+        "MULTI_WORKBOOK":   os.path.join(folder, "CV multi-sheet.xlsx") if number_of_samples <= EXCEL_MAX_SAMPLES else None,
+        "SPEC":             os.path.join(folder, "CV.figure.json"),
+        "SPEC_LATEX":       os.path.join(folder, "CV latex.figure.json"),
+    }
+
+    start_time = time.perf_counter()
+    if not os.path.exists(paths["CV_CSV"]):
+        write_CSV_in_blocks(paths["CV_CSV"], ["Potential (V)", "Current (mA)"], generate_CV_block, number_of_samples)
+    if not os.path.exists(paths["POLARIZATION_CSV"]):
+        headers = ["Current fresh (mA)", "Potential fresh (V)", "Current aged (mA)", "Potential aged (V)"]
+        aged_length = number_of_samples * 19 // 20
+        write_CSV_in_blocks(paths["POLARIZATION_CSV"], headers, generate_polarization_block, number_of_samples, [number_of_samples, number_of_samples, aged_length, aged_length])
+    if paths["SINGLE_WORKBOOK"] and not os.path.exists(paths["SINGLE_WORKBOOK"]):
+        write_workbook(paths["SINGLE_WORKBOOK"], [("CV fresh", number_of_samples)])
+    if paths["MULTI_WORKBOOK"] and not os.path.exists(paths["MULTI_WORKBOOK"]):
+        write_workbook(paths["MULTI_WORKBOOK"], [(sheet_name, number_of_samples // len(MULTI_SHEET_NAMES)) for sheet_name in MULTI_SHEET_NAMES])
+    if not os.path.exists(paths["SPEC"]):
+        write_figure_spec(paths["SPEC"], paths["CV_CSV"])
+    if not os.path.exists(paths["SPEC_LATEX"]):
+        write_figure_spec(paths["SPEC_LATEX"], paths["CV_CSV"], text_mode="latex")
+
+    generate_time = time.perf_counter() - start_time
+    if generate_time > 1:
+        print(f"Generated {number_of_samples} sample datasets in {generate_time:.1f} s: {folder}")
+    return paths
+
+
+def write_figure_spec(spec_path, CSV_path, text_mode="mathtext"):
+    """The spec of the CV figure, with the synthetic CSV-file and the text mode of functions.set_LaTeX_and_CMU. The PDF is named after the spec"""
+    with open(os.path.join(CV_PATH, "CV curves.figure.json"), 'r', encoding='utf-8') as spec_file:
+        spec = json.load(spec_file)
+    spec.update({"CSV": CSV_path, "PDF": spec_path[:-len(".figure.json")] + ".pdf", "text_mode": text_mode, "area": 1})
+    spec["series"] = [{"label": "Synthetic CV", "color": "b", "x": {"column": 0}, "y": {"column": 1}}]
+    spec["axis_limits"] = {"x": [0, 1.05], "y": [None, None]}
+    with open(spec_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(spec, spec_file, indent=4)
+
+
+def run_case(setup, operation, variables):
+    """Runs the setup and the timed operation in a fresh interpreter in CV_PATH with an empty cache. Returns (time in s, peak memory growth in bytes)"""
+    with tempfile.TemporaryDirectory() as cache_directory:
+        variables = dict(variables, OUTPUT_CSV=os.path.join(cache_directory, "output.csv"))
+        code = CHILD_TEMPLATE.format(variables="\n".join(f"{name} = {value!r}" for name, value in variables.items()), setup=setup, operation=operation)
+        environment = dict(os.environ, TIF351_CACHE_DIRECTORY=cache_directory, TIF351_OUTPUT="silent", MPLBACKEND="Agg")
+        output = subprocess.run([sys.executable, "-c", code], cwd=CV_PATH, env=environment, capture_output=True, text=True)
+
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else "failed")
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    return result["time"], result["peak_memory"]
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CURRENT_PATH, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def get_environment():
+    """Versions and machine of the run, results are only comparable on the same machine"""
+    versions = {}
+    for module in ["numpy", "pandas", "scipy", "matplotlib", "openpyxl"]:
+        try:
+            versions[module] = subprocess.run([sys.executable, "-c", f"import {module}; print({module}.__version__)"], capture_output=True, text=True, check=True).stdout.strip()
+        except subprocess.CalledProcessError:
+            versions[module] = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(), "processors": os.cpu_count(), "versions": versions}
+
+
+def benchmark(sizes, repeat=3, case_names=None, data_directory=DATA_DIRECTORY):
+    """Runs every case for every size repeat times. Prints a table and returns a list of result dicts (the fastest run)"""
+    results = []
+    print(f"{'case':<26} {'dataset':<13} {'samples':>10} {'time / s':>10} {'memory / MB':>12}")
+
+    for number_of_samples in sizes:
+        datasets = get_datasets(number_of_samples, data_directory)
+        variables = {"CV_CSV": datasets["CV_CSV"], "POLARIZATION_CSV": datasets["POLARIZATION_CSV"], "SPEC": datasets["SPEC"], "SPEC_LATEX": datasets["SPEC_LATEX"]}
+
+        for name, dataset, setup, operation in CASES:
+            if case_names and name not in case_names:
+                continue
+            if name in LATEX_CASES and shutil.which("latex") is None:
+                print(f"{name:<26} {dataset:<13} {number_of_samples:>10} {'skipped':>10}  no LaTeX installation")
+                continue
+            if dataset != "CSV":
+                workbook = datasets["SINGLE_WORKBOOK" if dataset == "single-sheet" else "MULTI_WORKBOOK"]
+                if workbook is None:
+                    continue
+                variables["WORKBOOK"] = workbook
+
+            result = {"case": name, "dataset": dataset, "samples": number_of_samples}
+            try:
+                runs = [run_case(setup, operation, variables) for _ in range(repeat)]
+                result["time"] = min(wall_time for wall_time, _ in runs)
+                result["times"] = [wall_time for wall_time, _ in runs]
+                result["peak_memory"] = max((memory for _, memory in runs if memory is not None), default=None)
+                memory = f"{result['peak_memory']/1e6:.1f}" if result["peak_memory"] is not None else "-"
+                print(f"{name:<26} {dataset:<13} {number_of_samples:>10} {result['time']:>10.4f} {memory:>12}")
+            except RuntimeError as error:
+                result["error"] = str(error)
+                print(f"{name:<26} {dataset:<13} {number_of_samples:>10} {'failed':>10}  {error}")
+            results.append(result)
+
+    return results
+
+
+def save_results(results, path):
+    report = {"commit": get_git_commit(), "created": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": get_environment(), "results": results}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"\nSaved results: {path}")
+    return report
+
+
+def compare_results(report, other_path):
+    """Prints the time and memory of the results relative to the results in other_path, e.g. of an earlier commit"""
+    with open(other_path, 'r', encoding='utf-8') as other_file:
+        other = json.load(other_file)
+    other_results = {(result["case"], result["dataset"], result["samples"]): result for result in other["results"]}
+
+    print(f"\nCompared with {other['commit']} ({other_path}), ratio < 1 is faster or smaller now")
+    print(f"{'case':<26} {'dataset':<13} {'samples':>10} {'time ratio':>11} {'memory ratio':>13}")
+    for result in report["results"]:
+        other_result = other_results.get((result["case"], result["dataset"], result["samples"]))
+        if other_result is None or "time" not in result or "time" not in other_result:
+            continue
+        time_ratio = result["time"] / other_result["time"]
+        memory_ratio = f"{result['peak_memory'] / other_result['peak_memory']:.2f}" if result.get("peak_memory") and other_result.get("peak_memory") else "-"
+        print(f"{result['case']:<26} {result['dataset']:<13} {result['samples']:>10} {time_ratio:>11.2f} {memory_ratio:>13}")
+
+
+# MAIN #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data paths of the lab code on synthetic CV and polarization data.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="numbers of samples, e.g. 1e4 1e6 1e8 (default 1e4 1e5 1e6)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is used (default 3)")
+    parser.add_argument("--cases", nargs="+", default=None, help="names of the cases to run (default all): " + ", ".join(name for name, *_ in CASES))
+    parser.add_argument("--data-directory", default=DATA_DIRECTORY, help="where the synthetic datasets are kept between runs")
+    parser.add_argument("--output", default=None, help="JSON-file of the results (default 'Benchmark results/<git commit>.json')")
+    parser.add_argument("--compare", default=None, help="JSON-file of earlier results to compare with")
+    arguments = parser.parse_args()
+
+    results = benchmark([int(size) for size in arguments.sizes], arguments.repeat, arguments.cases, arguments.data_directory)
+    report = save_results(results, arguments.output or os.path.join(RESULTS_PATH, get_git_commit() + ".json"))
+    if arguments.compare:
+        compare_results(report, arguments.compare)
@@ -0,0 +1,109 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Build all figures.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Build every figure of the lab without showing any windows.
+##              1. Find all figure jobs ('* plotting.py' in the folders).
+##              2. Run them in parallel processes with the Agg backend,
+##                 each exporting its PDF if its spec or data changed.
+##              3. Print a summary of every job.
+##              Usage: python "Build all figures.py" [--processes N] [--list]
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import io
+import sys
+import glob
+import time
+import runpy
+import argparse
+import contextlib
+import traceback
+import multiprocessing
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+JOB_PATTERN = os.path.join(CURRENT_PATH, "*", "* plotting.py")
+
+
+# FUNCTIONS #
+def find_figure_jobs(pattern=JOB_PATTERN):
+    """Returns the paths to all plotting scripts, sorted"""
+    return sorted(glob.glob(pattern))
+
+
+def run_figure_job(script_path):
+    """Runs one plotting script headless and returns a summary dict of it. Runs in its own process, since the
+    folders have their own CSV_handler.py and functions.py with the same module names"""
+    os.environ["MPLBACKEND"] = "Agg"
+    import matplotlib
+    matplotlib.use("Agg")
+
+    sys.path.insert(0, os.path.dirname(script_path))
+    log = io.StringIO()
+    start_time = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(log):
+            script_globals = runpy.run_path(script_path, run_name="batch_figure_job")
+        PDF_path = script_globals.get("PDF_path")
+        build_status = script_globals.get("build_status", "built")
+        error = None
+    except Exception:
+        PDF_path = None
+        build_status = "failed"
+        error = traceback.format_exc()
+
+    return {
+        "job":      os.path.relpath(script_path, CURRENT_PATH),
+        "ok":       error is None,
+        "status":   build_status,
+        "time":     time.perf_counter() - start_time,
+        "PDF_path": PDF_path,
+        "PDF_size": os.path.getsize(PDF_path) if PDF_path and os.path.exists(PDF_path) else None,
+        "log":      log.getvalue(),
+        "error":    error,
+    }
+
+
+def print_summary(results, total_time):
+    for result in results:
+        status = result["status"].upper()
+        size = f"{result['PDF_size']/1000:.1f} kB" if result["PDF_size"] is not None else "no PDF"
+        print(f"{status:<9} {result['time']:6.2f} s  {size:>10}  {result['job']}")
+        if not result["ok"]:
+            print(result["log"] + result["error"])
+
+    number_ok = sum(result["ok"] for result in results)
+    print(f"\n{number_ok}/{len(results)} figures built in {total_time:.2f} s")
+
+
+def build_all_figures(processes=None):
+    """Builds every figure job across a pool of processes and prints a summary. Returns the number of failed jobs"""
+    jobs = find_figure_jobs()
+    start_time = time.perf_counter()
+
+    # a new process for every job, so modules with the same name in different folders never mix
+    with multiprocessing.Pool(processes=processes, maxtasksperchild=1) as pool:
+        results = pool.map(run_figure_job, jobs, chunksize=1)
+
+    print_summary(results, time.perf_counter() - start_time)
+    return sum(not result["ok"] for result in results)
+
+
+# MAIN #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build every figure of the lab as PDF, in parallel and without showing any windows.")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--list", action="store_true", help="only list the figure jobs")
+    arguments = parser.parse_args()
+
+    if arguments.list:
+        print("\n".join(os.path.relpath(job, CURRENT_PATH) for job in find_figure_jobs()))
+    else:
+        sys.exit(build_all_figures(arguments.processes))
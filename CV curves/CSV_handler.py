@@ -2,39 +2,107 @@
 ##        File: CSV_handler.py
 ##      Author: GOTTFRID OLSSON 
 ##     Created: 2022-02-04
-##     Updated: 2023-08-04
+##     Updated: 2026-10-18
 ##       About: Useful functions for handling
 ##              CSV-files.
 ##              Useful functions:
+##               - read_appended, follow
 ##               - combine_CSV_files_to_one
 ##               - print_arrays_to_CSV
 ##               - print_CSV_to_LaTeX_table
+##              Parsed files are cached with
+##              cache_handler.
 ##===============================================##
 
 
 ## LIBRARIES ##
-import pandas as pd
+# pandas and numpy are imported in the functions that use them, so that importing this module stays fast
+import os
+import io
+import time
+import cache_handler
+import instrumentation
 from datetime import datetime #for metadata in print_CSV_to_LaTeX_table
 
 ## CONSTANTS ##
 CSV_DELIMITER = ','
+CSV_WRITE_BLOCK_ROWS = 65536 # rows formatted and written per chunk in print_arrays_to_CSV
+CSV_MERGE_BLOCK_CELLS = 2**20 # cells (rows x columns over all inputs) held in memory per block in combine_CSV_files_to_one
 
 
 ## FUNCTIONS ##
-def read(CSV_file_path, skiprows=0, print_message=True):
-    #print("In progress: Reading CSV" + CSV_filePath)
-    CSV =  pd.read_csv(CSV_file_path, sep=CSV_DELIMITER, skiprows=skiprows)
-    if print_message:
-        print("DONE: Reading CSV: " + CSV_file_path)
+def read(CSV_file_path, skiprows=0, print_message=True, columns=None, dtype=None, engine=None, chunksize=None, use_cache=True):
+    """Reads a CSV file to a pandas DataFrame
+
+    INPUT:
+        CSV_file_path: path to the CSV file
+
+        skiprows: number of lines at the start of the file to skip (default 0)
+
+        print_message: displays a message "DONE: Reading CSV: (...)" with the time it took, see instrumentation.py (default True)
+
+        columns: list of column names or column indices to read, in the order they should be returned (default None, all columns)
+
+        dtype: dtype of the values, e.g. 'float32' to use half the memory of float64 (default None, pandas decides)
+
+        engine: parser engine, 'c', 'python', 'pyarrow' or 'fast' which is 'pyarrow' if installed and otherwise 'c' (default None, pandas decides)
+
+        chunksize: if given, an iterator of DataFrames with at most chunksize rows each is returned instead of one DataFrame,
+                   so that large files can be processed chunk by chunk in bounded memory (default None)
+
+        use_cache: loads the parsed columns from cache_handler if the file is unchanged since it was last read (default True, not used with chunksize)
+
+    OUTPUT:
+        DataFrame with the selected columns, or an iterator of such DataFrames if chunksize is given
+    """
+    import pandas as pd
+    import numpy as np
+
+    header = None
+    if columns is not None:
+        header = list(read_header(CSV_file_path, skiprows=skiprows))
+        header = [header[column] if isinstance(column, (int, np.integer)) else column for column in columns]
+
+    def parse():
+        CSV = pd.read_csv(CSV_file_path, sep=CSV_DELIMITER, skiprows=skiprows, usecols=header, dtype=dtype,
+                          engine=get_CSV_engine(engine, chunksize), chunksize=chunksize)
+
+        if header is not None and chunksize is not None:
+            CSV = (chunk[header] for chunk in CSV)
+        elif header is not None:
+            CSV = CSV[header]
+        return CSV
+
+    with instrumentation.span("Reading CSV", CSV_file_path, print_message=print_message, chunksize=chunksize):
+        if use_cache and chunksize is None:
+            CSV = cache_handler.load(CSV_file_path, parse, key_options={'skiprows': skiprows, 'columns': header, 'dtype': str(dtype)})
+        else:
+            CSV = parse()
+
     return CSV
 
+
+def get_CSV_engine(engine, chunksize=None):
+    """Returns the pandas parser engine to use: 'fast' picks 'pyarrow' if it is installed and otherwise 'c'. 'pyarrow' can not read in chunks, so 'c' is used then"""
+    if engine not in ('fast', 'pyarrow'):
+        return engine
+
+    if chunksize is not None:
+        return 'c'
+
+    try:
+        import pyarrow
+    except ImportError:
+        return 'c'
+    return 'pyarrow'
+
 # i'm not sure how to do this nicely. yet. //2022-02-04, 19:12
 def write_DataFrame_to_CSV(DataFrame, write_file_path, encoding='utf-8'):
-    print("In progress: Exporting DataFrame to CSV")
-    DataFrame.to_csv(write_file_path, sep=CSV_DELIMITER, encoding=encoding, index=False)
-    print("Done: Writing DataFrame to CSV: " + write_file_path)
+    with instrumentation.span("Writing DataFrame to CSV", write_file_path):
+        DataFrame.to_csv(write_file_path, sep=CSV_DELIMITER, encoding=encoding, index=False)
 
 def combine_list_of_lists_and_header_to_DataFrame(list_of_lists, header):
+    import pandas as pd
     dataframe = pd.DataFrame(list_of_lists).transpose()
     dataframe.columns = header
     return dataframe
@@ -42,8 +110,139 @@ def combine_list_of_lists_and_header_to_DataFrame(list_of_lists, header):
 def get_header(CSV_data):
     return CSV_data.columns.values
 
+def read_header(CSV_file_path, skiprows=0):
+    """Reads only the header line of a CSV file, without parsing any values"""
+    import pandas as pd
+    return get_header(pd.read_csv(CSV_file_path, sep=CSV_DELIMITER, skiprows=skiprows, nrows=0))
+
+
+def read_complete_header(CSV_file_path, skiprows=0):
+    """Returns (header, byte offset of the first row) of a CSV file, or (None, 0) while the file is empty or its header line
+    has no newline yet, e.g. a log that was just created and may still be writing the header"""
+    import pandas as pd
+
+    with open(CSV_file_path, 'rb') as CSV_file:
+        lines = [CSV_file.readline() for _ in range(skiprows + 1)] # skipped lines and the header
+        offset = CSV_file.tell()
+    if not lines[-1].endswith(b"\n"):
+        return None, 0
+    return list(get_header(pd.read_csv(io.BytesIO(lines[-1]), sep=CSV_DELIMITER, nrows=0))), offset
+
+
+def read_appended(CSV_file_path, state=None, skiprows=0, dtype=None, print_message=False, final=False):
+    """Reads only the rows appended to a CSV file since the last call, e.g. a log the potentiostat is still writing to
 
-def combine_CSV_files_to_one(output_path, paths):
+    INPUT:
+        CSV_file_path: path to the CSV file
+
+        state: dict returned by the last call for this file (default None, the first call reads every row there is)
+
+        skiprows: number of lines at the start of the file to skip before the header (default 0)
+
+        dtype: dtype of the values, e.g. 'float32' (default None, pandas decides)
+
+        print_message: displays a message "DONE: Reading appended CSV rows: (...)" with the time it took (default False)
+
+        final: also reads the last line if it has no newline, when nothing more will be appended to the file (default False)
+
+    OUTPUT:
+        (DataFrame of the new rows, with the header of the file, state for the next call)
+        state['restarted'] is True if the file got shorter or was replaced by a new file since the rows read before (a restarted log):
+        it is then read from the start again, and anything computed from the earlier rows must be reset
+
+    Only the bytes after the last complete line read are parsed, so the cost is proportional to the new rows.
+    A line without its newline yet is left for the next call. Until the header line is complete, an empty DataFrame without
+    columns is returned and no rows are read.
+    """
+    import pandas as pd
+
+    restarted = False
+    file_stat = os.stat(CSV_file_path)
+    if state is not None and state['header'] is not None and (file_stat.st_size < state['offset'] or file_stat.st_ino != state['inode']):
+        state, restarted = None, True
+    if state is None or state['header'] is None:
+        restarted = restarted or (state is not None and state['restarted']) # kept until the header of the new file is read
+        header, offset = read_complete_header(CSV_file_path, skiprows=skiprows)
+        if header is None:
+            return pd.DataFrame(), {'header': None, 'offset': 0, 'rows': 0, 'restarted': restarted}
+        state = {'header': header, 'offset': offset, 'rows': 0, 'inode': file_stat.st_ino}
+
+    with instrumentation.span("Reading appended CSV rows", CSV_file_path, print_message=print_message) as record, \
+         open(CSV_file_path, 'rb') as CSV_file:
+        CSV_file.seek(state['offset'])
+        new_bytes = CSV_file.read()
+        if not final:
+            new_bytes = new_bytes[:new_bytes.rfind(b"\n") + 1] # only complete lines
+
+        if new_bytes.strip():
+            # columns are named by position while parsing, since the header may repeat names
+            CSV = pd.read_csv(io.BytesIO(new_bytes), sep=CSV_DELIMITER, header=None, names=range(len(state['header'])), dtype=dtype)
+        else:
+            CSV = pd.DataFrame({j: pd.Series(dtype=dtype if dtype is not None else float) for j in range(len(state['header']))})
+        CSV.columns = state['header']
+
+        state = dict(state, offset=state['offset'] + len(new_bytes), rows=state['rows'] + CSV.shape[0], restarted=restarted)
+        record['fields'].update(rows=CSV.shape[0])
+
+    return CSV, state
+
+
+def follow(CSV_file_path, interval=1.0, timeout=None, skiprows=0, dtype=None, print_message=False):
+    """Follows a CSV file that is being appended to, like tail -f. Yields the rows already in the file,
+    and then the new rows every time the file has grown
+
+    INPUT:
+        CSV_file_path: path to the CSV file, which may still be empty
+
+        interval: seconds between every check of the size of the file (default 1.0)
+
+        timeout: stops after this many seconds without new rows, the last line is then read even without its newline
+                 (default None, follows until interrupted, e.g. with Ctrl+C)
+
+        skiprows, dtype, print_message: as in read_appended
+
+    OUTPUT:
+        yields (DataFrame of the new rows, restarted), only when there are new rows. restarted is True if the log was restarted
+        (see read_appended) since the rows yielded before: the rows are then the start of the new file, reset what was computed before
+    """
+    state = None
+    restarted = False
+    last_new_rows = time.monotonic()
+    last_signature = None
+    while True:
+        file_stat = os.stat(CSV_file_path)
+        signature = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino) # a replaced file may have the same size
+        if signature != last_signature:
+            last_signature = signature
+            CSV, state = read_appended(CSV_file_path, state, skiprows=skiprows, dtype=dtype, print_message=print_message)
+            restarted = restarted or state['restarted']
+            if CSV.shape[0] > 0:
+                last_new_rows = time.monotonic()
+                yield CSV, restarted
+                restarted = False
+
+        if timeout is not None and time.monotonic() - last_new_rows >= timeout:
+            break
+        time.sleep(interval)
+
+    CSV, state = read_appended(CSV_file_path, state, skiprows=skiprows, dtype=dtype, print_message=print_message, final=True)
+    if CSV.shape[0] > 0:
+        yield CSV, restarted or state['restarted']
+
+
+def get_merge_dtypes(path, columns, block_rows):
+    """dtype of every column of a file to merge, from its first block: float for numbers, so that a value is written the same way ('7.0')
+    whatever block it is in, and str for text and booleans. Returns a dict of column name to dtype, or None for an empty file"""
+    import pandas as pd
+
+    first_block = next(iter(read(CSV_file_path=path, print_message=False, columns=columns, chunksize=block_rows)), None)
+    if first_block is None:
+        return None
+    return {header: float if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) else str
+            for header, dtype in first_block.dtypes.items()}
+
+
+def combine_CSV_files_to_one(output_path, paths, columns=None, header=None):
     """Takes several CSV files and appends them columnwise to a new CSV file
 
     INPUT:
@@ -51,30 +250,85 @@ def combine_CSV_files_to_one(output_path, paths):
         
         paths: paths to CSV files in array: [csv_path_1, csv_path_2, ..., csv_path_n]
 
+        columns: for every path, a list of the column names or indices to take from it in that order, or None for all (default None, all columns of all files)
+
+        header: names of all the columns of the output file (default None, the headers of the files)
+
+    The files are read and written block by block (CSV_MERGE_BLOCK_CELLS values at a time), so memory use does not grow
+    with the size of the files. Files shorter than the longest one are padded with empty cells. Numeric columns are read as floats
+    and the other columns as text, see get_merge_dtypes.
+
     Code modified from: https://stackoverflow.com/questions/19945296/combining-csv-files-column-wise
     """
+    import pandas as pd
 
-    headers = []
-    columns = []
+    columns = [None] * len(paths) if columns is None else columns
+    headers_per_path = [read_header(path) for path in paths]
+    headers_per_path = [headers if path_columns is None else [headers[column] if isinstance(column, int) else column for column in path_columns]
+                        for headers, path_columns in zip(headers_per_path, columns)]
+    number_of_columns = sum(len(headers) for headers in headers_per_path)
+    block_rows = max(1, CSV_MERGE_BLOCK_CELLS // max(1, number_of_columns))
 
-    for path in paths:
+    readers = [read(path, print_message=False, columns=path_columns, dtype=get_merge_dtypes(path, path_columns, block_rows), chunksize=block_rows)
+               for path, path_columns in zip(paths, columns)]
+    empty_lines = [CSV_DELIMITER * (len(headers) - 1) for headers in headers_per_path]
+    all_headers = [header for headers in headers_per_path for header in headers] if header is None else list(header)
+    if len(all_headers) != number_of_columns:
+        raise ValueError(f"WARNING: the header has {len(all_headers)} names for {number_of_columns} columns!")
 
-        CSV_i = read(path, print_message=False)
-        headers_i = get_header(CSV_i)
+    with instrumentation.span("Combining CSV files", f"{len(paths)} files to '{output_path}'", files=len(paths)), \
+         open(output_path, 'w', encoding='utf-8', buffering=2**20) as CSV_file:
+
+        # Print header line, quoted the same way as the values
+        CSV_file.write(pd.DataFrame(columns=all_headers).to_csv(sep=CSV_DELIMITER, index=False, lineterminator="\n"))
+
+        # Print one block of lines from every file side by side, until all files are exhausted
+        while True:
+            blocks = [next(reader, None) for reader in readers]
+            if all(block is None for block in blocks):
+                break
+
+            lines_per_path = [[] if block is None else block.to_csv(sep=CSV_DELIMITER, index=False, header=False, lineterminator="\n").splitlines() for block in blocks]
+            number_of_lines = max(len(lines) for lines in lines_per_path)
+            if number_of_lines == 0:
+                continue
+
+            for lines, empty_line in zip(lines_per_path, empty_lines):
+                lines.extend([empty_line] * (number_of_lines - len(lines)))
+
+            CSV_file.write("\n".join(map(CSV_DELIMITER.join, zip(*lines_per_path))) + "\n")
 
-        for header in headers_i:
-            headers.append(header)
-            columns.append(CSV_i[header])
-    
-    dataframe = combine_list_of_lists_and_header_to_DataFrame(columns, headers)
-    write_DataFrame_to_CSV(dataframe, output_path)
-    
-    print(f"Successfully appended {len(paths)} CSV files to output path: '{output_path}'")
     
 
 
 
-def print_arrays_to_CSV(path_to_CSV_file, *args, print_message=False):
+def format_array_block_to_strings(array, block_start, block_stop):
+    """Formats the lines block_start to block_stop of an array as strings, the same way str(array[line]) would
+
+    INPUT:
+        array: NumPy array, pandas Series or list (Series are read by position, not by index label)
+
+        block_start, block_stop: first and one-past-last line of the block
+
+    OUTPUT:
+        list of (block_stop - block_start) strings, lines outside the length of the array are empty strings ''
+    """
+    import numpy as np
+
+    if hasattr(array, "to_numpy"): # pandas Series
+        array = array.to_numpy()
+
+    values = array[block_start:block_stop]
+
+    if isinstance(values, np.ndarray):
+        strings = values.astype(str).tolist() # same shortest round-trip formatting as str() on each element
+    else:
+        strings = [str(value) for value in values]
+
+    return strings + [""] * (block_stop - block_start - len(strings))
+
+
+def print_arrays_to_CSV(path_to_CSV_file, *args, print_message=False, append=False):
     """Prints array(s) with corresponding header(s) to a file with comma separated values (CSV)
 
         Input:
@@ -83,7 +337,9 @@ def print_arrays_to_CSV(path_to_CSV_file, *args, print_message=False):
             *args: array(s) and corresponding header(s) in this format:
                     header_1, array_1, header_2, array_2, ..., header_n, array_n
 
-            print_message: displays a message "Sucessfully printed CSV file (...)" (default False)
+            print_message: displays a message "DONE: Printing arrays to CSV: (...)" (default False)
+
+            append: appends the lines to the end of the file, the header is only printed if the file is new or empty (default False)
 
         Output:
             A CSV file with utf-8 formatting at path_to_csv, with the array(s) as column(s) and corresponding header(s)
@@ -114,40 +370,82 @@ def print_arrays_to_CSV(path_to_CSV_file, *args, print_message=False):
         raise ValueError("WARNING: the number of arrays does not equal the number of headers!")
 
 
-    with open(path_to_CSV_file, 'w', encoding="utf-8") as CSV_file:
+    number_of_lines = max(lines_per_array)
+
+    with instrumentation.span("Printing arrays to CSV", f"{len(arrays)} arrays to '{path_to_CSV_file}'", print_message=print_message, lines=number_of_lines), \
+         open(path_to_CSV_file, 'a' if append else 'w', encoding="utf-8", buffering=2**20) as CSV_file:
         
-        # Print header line
-        for header_number, header in enumerate(headers):
-            CSV_file.write(str(header))
-
-            # print comma separator between values (CSV) or newline at end of line
-            if header_number != len(headers) - 1:
-                CSV_file.write(",")
-            else:
-                CSV_file.write("\n")
-
-        # Print CSV data
-        for line in range(max(lines_per_array)):
-
-            for array_number, array in enumerate(arrays):
-                # print value of array at line, or if outside length of aray print nothing
-                try:
-                    CSV_file.write(str(array[line]))
-                except:
-                    CSV_file.write(str("")) 
-                
-                # print comma separator between values (CSV) or newline at end of line
-                if array_number != len(arrays) - 1:
-                    CSV_file.write(",")
-                else:
-                    CSV_file.write("\n")
-    
+        # Print header line, not in the middle of a file that is appended to
+        if CSV_file.tell() == 0:
+            CSV_file.write(CSV_DELIMITER.join(str(header) for header in headers) + "\n")
+
+        # Print CSV data, one block of lines at a time, formatting each array columnwise
+        for block_start in range(0, number_of_lines, CSV_WRITE_BLOCK_ROWS):
+            block_stop = min(block_start + CSV_WRITE_BLOCK_ROWS, number_of_lines)
+            columns = [format_array_block_to_strings(array, block_start, block_stop) for array in arrays]
+            lines = map(CSV_DELIMITER.join, zip(*columns))
+            CSV_file.write("\n".join(lines) + "\n")
+
+
+
+def format_LaTeX_table_rows(CSV_data, row_positions, column_positions):
+    """Formats the selected rows and columns of a DataFrame as rows of a LaTeX table, one column at a time
+
+    INPUT:
+        CSV_data: DataFrame with the values
+
+        row_positions: positions of the rows to format, in the order they should be printed (may repeat)
+
+        column_positions: positions of the columns to format, in the order they should be printed (may repeat)
+
+    OUTPUT:
+        string with one table row per line, e.g. '\\num{0.1} & \\num{2.0} \\\\ \\addlinespace \\n'
+    """
+    import numpy as np
 
-    if print_message:
-        print(f"Successfully printed {len(arrays)} arrays to CSV file at path: '{path_to_CSV_file}'")
+    sub_frame = CSV_data.iloc[row_positions, column_positions]
+    if sub_frame.shape[0] == 0:
+        return ''
 
+    # values are formatted like f'{value.item()}', i.e. as the shortest repr of the number, but a whole column at once
+    columns = [np.char.add(np.char.add('\\num{', sub_frame.iloc[:, j].to_numpy().astype(str)), '}') for j in range(sub_frame.shape[1])]
+    lines = map(' & '.join, zip(*columns))
+    return ' \\\\ \\addlinespace \n'.join(lines) + ' \\\\ \\addlinespace \n'
 
-def print_CSV_to_LaTeX_table(CSV_filepath, TXT_filepath, column_indices=None, row_indices=None, column_names=None, caption='Caption', table_placement='hbt!', print_message=True, include_metadata=True):
+
+def get_LaTeX_table_rows(CSV_filepath, row_indices, column_indices, chunksize=None):
+    """Yields the formatted rows of print_CSV_to_LaTeX_table as strings, the whole table at once or chunk by chunk if chunksize is given"""
+    import numpy as np
+
+    if chunksize is None:
+        CSV_data = read(CSV_filepath)
+        yield format_LaTeX_table_rows(CSV_data, slice(None) if row_indices is None else row_indices, column_indices)
+        return
+
+    if row_indices is None:
+        # all rows in file order: every chunk is printed as soon as it is formatted
+        for CSV_chunk in read(CSV_filepath, chunksize=chunksize):
+            yield format_LaTeX_table_rows(CSV_chunk, slice(None), column_indices)
+        return
+
+    # selected rows in any order: only the selected rows are kept while streaming, then printed in the requested order
+    row_indices = np.asarray(row_indices, dtype=int)
+    formatted_rows = {}
+    chunk_start = 0
+    for CSV_chunk in read(CSV_filepath, chunksize=chunksize):
+        chunk_stop = chunk_start + CSV_chunk.shape[0]
+        positions = np.unique(row_indices[(row_indices >= chunk_start) & (row_indices < chunk_stop)])
+        lines = format_LaTeX_table_rows(CSV_chunk, positions - chunk_start, column_indices).splitlines(keepends=True)
+        formatted_rows.update(zip(positions.tolist(), lines))
+        chunk_start = chunk_stop
+
+    missing_rows = [row_index for row_index in row_indices.tolist() if row_index not in formatted_rows]
+    if missing_rows:
+        raise IndexError(f"Row indices {missing_rows} are out of range for CSV file with {chunk_start} rows: {CSV_filepath}")
+    yield ''.join(formatted_rows[row_index] for row_index in row_indices.tolist())
+
+
+def print_CSV_to_LaTeX_table(CSV_filepath, TXT_filepath, column_indices=None, row_indices=None, column_names=None, caption='Caption', table_placement='hbt!', print_message=True, include_metadata=True, chunksize=None):
     '''
         Takes a CSV-file and prints selected columns and rows as a table, formatted for use in LaTeX, to a TXT-file.
         Note: utf-8 encoding is used, i.e. 'å', 'ä', and 'ö' will not be recognized.
@@ -159,34 +457,33 @@ def print_CSV_to_LaTeX_table(CSV_filepath, TXT_filepath, column_indices=None, ro
         OPTIONAL ARGUMENTS
         column_indices:     (list) indices selecting columns to print (e.g. [0,1,3,5]). Note: can be in any order, e.g. [1,2,0,3] is ok
         row_indices:        (list) indices selecting rows to pring (e.g. [0,2,3]). Note: can be in any order, e.g. [5,1,3] is ok
-        column_names:       (list of strings) names of columns to be printed in table (index corresponds to header in df), if 'None' the header of the CSV-file will be used (e.g. ['Col 1', 'Col 2', None, 'Col 4'])
+        column_names:       (list of strings) names of columns to be printed in table (index corresponds to column_indices), if 'None' the header of the CSV-file will be used (e.g. ['Col 1', 'Col 2', None, 'Col 4'])
         caption:            (string) caption of table (default: 'Caption')
         table_placement:    (string) placement of table (default: 'hbt!')
         print_message:      (bool) prints a message of what CSV-file got printed to what TXT-file (default: True)
         include_metadata:   (bool) prints metadata (date and time and settings for the CSV to table conversion) as a comment, with %, in LaTeX (default: True)
+        chunksize:          (int) reads the CSV-file this many rows at a time, so that very long tables are printed in bounded memory (default: None, whole file at once)
     '''
     
-    # Read CSV #
-    df = read(CSV_filepath)
-    header = get_header(df)
-
+    # Read header #
+    header = read_header(CSV_filepath)
 
-    # Assign row and column indices #
-    if row_indices is None:
-        row_indices = [i for i in range(df.shape[0])]
 
+    # Assign column indices #
     if column_indices is None:
-        column_indices = [j for j in range(df.shape[1])]
+        column_indices = [j for j in range(len(header))]
 
 
     # Open and write to file #
-    with open(TXT_filepath, 'w') as table:
+    with instrumentation.span("Printing CSV to LaTeX table", f"{CSV_filepath} to {TXT_filepath}", print_message=print_message), \
+         open(TXT_filepath, 'w') as table:
 
         # Metadata #
-        date_time = datetime.now()
-        date_time = date_time.strftime("%Y-%m-%d %H:%M")
-        CSV_filename = CSV_filepath.split("\\")[-1]
-        table.write(f'% {date_time}, table created from CSV-file: {CSV_filename}, using row indices: {row_indices}, column indices: {column_indices}\n')
+        if include_metadata:
+            date_time = datetime.now()
+            date_time = date_time.strftime("%Y-%m-%d %H:%M")
+            CSV_filename = os.path.basename(CSV_filepath.replace("\\", os.sep))
+            table.write(f'% {date_time}, table created from CSV-file: {CSV_filename}, using row indices: {"all" if row_indices is None else list(row_indices)}, column indices: {list(column_indices)}\n')
 
 
         # Initiate table #
@@ -195,41 +492,22 @@ def print_CSV_to_LaTeX_table(CSV_filepath, TXT_filepath, column_indices=None, ro
     
 
         # Column names #
+        names = []
         for i, column_index in enumerate(column_indices):
-            try:
-                column_name = header[column_index]
-                if column_names[i] is not None:
-                    column_name = column_names[i]
-            except:
-                column_name = header[column_index]
-            
-            table.write(column_name)
-            
-            if column_index != column_indices[-1]:
-                table.write(' & ')
-                
-        table.write('\\\\ \n\\midrule \n')
-
-
-        # Values #
-        for i, row_index in enumerate(row_indices):
-
-            for j, column_index in enumerate(column_indices):
-                value = df.loc[i,header[j]].item()
-                table.write('\\num{')
-                table.write(f'{value}')
-                table.write('}')
-
-                if column_index != column_indices[-1]:
-                    table.write(' & ')
-                else:
-                    table.write(' \\\\ \\addlinespace \n')
+            column_name = header[column_index]
+            if column_names is not None and i < len(column_names) and column_names[i] is not None:
+                column_name = column_names[i]
+            names.append(column_name)
+
+        table.write(' & '.join(names) + '\\\\ \n\\midrule \n')
+
+
+        # Values, one write per table or chunk #
+        for rows in get_LaTeX_table_rows(CSV_filepath, row_indices, column_indices, chunksize):
+            table.write(rows)
 
 
         # Finalize table #
         table.write('\\bottomrule \n\\end{tabular} \n\\end{table}')
 
-        if print_message:
-            print(f"\nCSV-file: {CSV_filepath}\nhas successfully been printed as a LaTeX table: {TXT_filepath}\n")
-
 # EOF #
@@ -0,0 +1,92 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: CV live ECSA.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Follow a CV log that the potentiostat is still appending to,
+##              e.g. during a durability test that runs for hours.
+##              1. Parse only the rows appended since the last check
+##                 (CSV_handler.follow).
+##              2. Update the charge of every sweep and cycle with the new
+##                 samples only (CV_analysis.update_sweep_charge).
+##              3. Print the running ECSA and append every finished sweep
+##                 to a CSV-file, without reprocessing the history.
+##              Usage: python "CV live ECSA.py" [CSV-file] [--timeout S] [...]
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import argparse
+import numpy as np
+import CSV_handler as CSV
+import series_handler
+import CV_analysis
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+filename_CSV_log = 'TIF351_Fuel-cell-laboration_CV-curve-data.csv'
+filename_CSV_sweeps = 'TIF351_Fuel-cell-laboration_CV-live-ECSA.csv'
+
+electrode_area = 0.0005  # Area of the platinum electrode, 5 m2
+surface_load = 4  # Surface load, 4 grams per m2
+surface_charge = 2.1  # Surface charge of a full proton layer on polycrystalline Pt, Coulomb/m2..
+integration_range = (0, 0.5)  # V
+
+
+# FUNCTIONS #
+def follow_CV_log(CSV_path, output_path, potential_column=0, current_column=1, interval=1.0, timeout=None):
+    """Follows a CV log and prints the running ECSA every time new rows are appended. Every finished sweep is appended to output_path,
+    which is started over if the log is restarted. Returns the state of CV_analysis.update_sweep_charge when the log has not grown for timeout seconds"""
+    state = None
+    number_written = 0
+
+    for rows, restarted in CSV.follow(CSV_path, interval=interval, timeout=timeout):
+        if restarted: # a new log, the rows are not a continuation of the sweeps so far
+            state, number_written = None, 0
+
+        potential = series_handler.from_column(rows, potential_column, unit='V')
+        current = series_handler.convert_unit(series_handler.from_column(rows, current_column, unit='mA'), 'A')
+        is_measured = ~np.isnan(potential['values']) & ~np.isnan(current['values'])
+        state = CV_analysis.update_sweep_charge(state, potential['values'][is_measured], current['values'][is_measured], integration_range)
+
+        # the last sweep is still being measured, every sweep before it is finished
+        ECSA = state['sweep_charge'] * state['sweep_direction'] / (surface_charge*surface_load*electrode_area)
+        number_finished = max(len(ECSA) - 1, 0)
+        if number_finished > number_written:
+            finished = slice(number_written, number_finished)
+            CSV.print_arrays_to_CSV(output_path,
+                                    'Sweep', np.arange(number_written, number_finished),
+                                    'Cycle', state['sweep_cycle'][finished],
+                                    'Direction', state['sweep_direction'][finished],
+                                    'Charge (C)', state['sweep_charge'][finished],
+                                    'ECSA (m^2 g^-1)', ECSA[finished],
+                                    append=number_written > 0)
+            number_written = number_finished
+
+        is_anodic = state['sweep_direction'][:number_finished] == 1
+        mean_ECSA = f"{ECSA[:number_finished][is_anodic].mean():.6f} m²/g" if is_anodic.any() else "-"
+        print(f"{state['samples']} samples, {number_finished} finished sweeps, mean anodic ECSA {mean_ECSA}")
+
+    return state
+
+
+# MAIN #
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Follow a growing CV log and update the ECSA of every sweep with the new rows only.")
+    parser.add_argument("CSV", nargs="?", default=os.path.join(CURRENT_PATH, filename_CSV_log), help="CV log to follow (default: the CV data of the lab)")
+    parser.add_argument("--output", default=os.path.join(CURRENT_PATH, filename_CSV_sweeps), help="CSV-file the finished sweeps are appended to")
+    parser.add_argument("--potential-column", type=int, default=0, help="column of the potential in V (default 0)")
+    parser.add_argument("--current-column", type=int, default=1, help="column of the current in mA (default 1)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between checks of the log (default 1)")
+    parser.add_argument("--timeout", type=float, default=None, help="stop after this many seconds without new rows (default: follow until Ctrl+C)")
+    arguments = parser.parse_args()
+
+    try:
+        follow_CV_log(arguments.CSV, arguments.output, arguments.potential_column, arguments.current_column, arguments.interval, arguments.timeout)
+    except KeyboardInterrupt:
+        pass
+
+# EOF #
@@ -0,0 +1,406 @@
+##===============================================##
+##        File: CV_analysis.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Vectorized analysis of cyclic
+##              voltammograms (CV).
+##              Useful functions:
+##               - segment_sweeps
+##               - integrate_per_sweep
+##               - update_sweep_charge
+##               - build_charge_index
+##               - query_charge
+##               - detect_hupd_window
+##===============================================##
+
+
+## LIBRARIES ##
+import numpy as np
+
+
+## FUNCTIONS ##
+def get_interval_directions(potential, tolerance=None):
+    """Returns the scan direction (+1 or -1) of every interval between two samples of the potential
+
+    Steps smaller than tolerance (default: half the median step) are noise around a turning point
+    and get the direction of the step before them.
+    """
+    steps = np.diff(np.asarray(potential, dtype=float))
+    if tolerance is None:
+        tolerance = 0.5 * np.median(np.abs(steps)) if len(steps) else 0.0
+
+    directions = np.where(np.abs(steps) > tolerance, np.sign(steps), 0).astype(np.int8)
+
+    # forward fill the noisy steps (0) with the last real direction, and the first ones with the first real direction
+    is_real = directions != 0
+    if not is_real.any():
+        return np.ones(len(steps), dtype=np.int8)
+    last_real_index = np.maximum.accumulate(np.where(is_real, np.arange(len(steps)), 0))
+    directions = directions[last_real_index]
+    directions[:np.argmax(is_real)] = directions[np.argmax(is_real)]
+    return directions
+
+
+def segment_sweeps(potential, tolerance=None):
+    """Splits a CV into sweeps (runs of increasing or decreasing potential) and cycles, in one vectorized pass
+
+    INPUT:
+        potential: (n,) array of the potential in the order it was measured
+
+        tolerance: potential steps smaller than this do not change the scan direction (default None, half the median step)
+
+    OUTPUT:
+        sweep_index: (n,) int array, the sweep every sample belongs to. Sample k belongs to the sweep of the interval k -> k+1,
+                     so a turning point is the first sample of the next sweep and the last sample belongs to the last sweep
+
+        sweep_direction: (number of sweeps,) int array, +1 for anodic (increasing potential) and -1 for cathodic sweeps
+
+        sweep_cycle: (number of sweeps,) int array, the cycle every sweep belongs to. A new cycle starts every time
+                     the scan direction of the first sweep comes back
+    """
+
+    number_of_samples = len(potential)
+    if number_of_samples < 2:
+        return np.zeros(number_of_samples, dtype=np.intp), np.ones(min(number_of_samples, 1), dtype=np.int8), np.zeros(min(number_of_samples, 1), dtype=np.intp)
+
+    directions = get_interval_directions(potential, tolerance)
+
+    interval_sweep_index = np.concatenate(([0], np.cumsum(directions[1:] != directions[:-1])))
+    sweep_index = np.append(interval_sweep_index, interval_sweep_index[-1])
+
+    sweep_starts = np.flatnonzero(np.diff(interval_sweep_index, prepend=-1))
+    sweep_direction = directions[sweep_starts]
+    sweep_cycle = np.cumsum(sweep_direction == sweep_direction[0]) - 1
+
+    return sweep_index, sweep_direction, sweep_cycle
+
+
+def integrate_per_sweep(potential, current, sweep_index, potential_window=None):
+    """Integrates the current over the potential, with the trapezoidal rule, separately for every sweep
+
+    INPUT:
+        potential, current: (n,) arrays in the order they were measured
+
+        sweep_index: (n,) int array from segment_sweeps
+
+        potential_window: (start, end) potential, only intervals with both samples inside are integrated (default None, everything)
+
+    OUTPUT:
+        (number of sweeps,) array of the integral of current d(potential) of every sweep.
+        The potential decreases in cathodic sweeps, so their integrals have the opposite sign of the current.
+    """
+
+    potential = np.asarray(potential, dtype=float)
+    current = np.asarray(current, dtype=float)
+    sweep_index = np.asarray(sweep_index)
+    number_of_sweeps = int(sweep_index[-1]) + 1 if len(sweep_index) else 0
+
+    interval_integrals = 0.5 * (current[1:] + current[:-1]) * np.diff(potential)
+    interval_sweep_index = sweep_index[:-1]
+
+    if potential_window is not None:
+        is_inside = (potential >= potential_window[0]) & (potential <= potential_window[1])
+        interval_integrals = np.where(is_inside[1:] & is_inside[:-1], interval_integrals, 0.0)
+
+    return np.bincount(interval_sweep_index, weights=interval_integrals, minlength=number_of_sweeps)
+
+
+def update_sweep_charge(state, potential, current, potential_window=None, tolerance=None):
+    """Segments and integrates new samples of a CV that is still being measured, continuing from the samples before them.
+    Only the new samples are processed, and the result is the same as segment_sweeps and integrate_per_sweep of all samples so far
+
+    INPUT:
+        state: dict returned by the last update (default None for the first samples)
+
+        potential, current: (n,) arrays of the new samples, in the order they were measured
+
+        potential_window: (start, end) potential, only intervals with both samples inside are integrated (default None, everything)
+
+        tolerance: potential steps smaller than this do not change the scan direction (default None, half the median step of the first update)
+
+    OUTPUT:
+        state: dict with
+            'sweep_charge':    (number of sweeps,) array of the integral of current d(potential) of every sweep, the last sweep is still being measured
+            'sweep_direction': (number of sweeps,) int array, +1 for anodic and -1 for cathodic sweeps
+            'sweep_cycle':     (number of sweeps,) int array, the cycle every sweep belongs to
+            'samples':         number of samples so far
+            and the last sample, scan direction and tolerance to continue from
+    """
+
+    potential = np.asarray(potential, dtype=float)
+    current = np.asarray(current, dtype=float)
+    if state is None:
+        state = {'sweep_charge': np.zeros(0), 'sweep_direction': np.zeros(0, dtype=np.int8), 'sweep_cycle': np.zeros(0, dtype=np.intp),
+                 'samples': 0, 'last_potential': None, 'last_current': None, 'direction': 0, 'tolerance': tolerance}
+    state = dict(state, samples=state['samples'] + len(potential))
+
+    # the last sample of the previous update is the start of the first new interval
+    if state['last_potential'] is not None:
+        potential = np.concatenate(([state['last_potential']], potential))
+        current = np.concatenate(([state['last_current']], current))
+    if len(potential) == 0:
+        return state
+    state['last_potential'], state['last_current'] = potential[-1], current[-1]
+    if len(potential) < 2:
+        return state
+
+    steps = np.diff(potential)
+    if state['tolerance'] is None:
+        state['tolerance'] = 0.5 * np.median(np.abs(steps))
+    directions = np.where(np.abs(steps) > state['tolerance'], np.sign(steps), 0).astype(np.int8)
+
+    # forward fill the noisy steps (0) with the last real direction, from the last update or else the first real one, as get_interval_directions
+    is_real = directions != 0
+    carried_direction = state['direction'] or (directions[np.argmax(is_real)] if is_real.any() else 1)
+    last_real_index = np.maximum.accumulate(np.where(is_real, np.arange(len(steps)), -1))
+    directions = np.where(last_real_index >= 0, directions[np.maximum(last_real_index, 0)], carried_direction).astype(np.int8)
+
+    # sweeps continue across updates, a new one starts where the direction changes
+    is_sweep_start = directions != np.concatenate(([state['direction']], directions[:-1]))
+    interval_sweep_index = len(state['sweep_direction']) - 1 + np.cumsum(is_sweep_start)
+    new_sweep_direction = directions[is_sweep_start]
+    first_direction = state['sweep_direction'][0] if len(state['sweep_direction']) else new_sweep_direction[0] if len(new_sweep_direction) else 1
+    last_cycle = state['sweep_cycle'][-1] if len(state['sweep_cycle']) else -1
+    state['sweep_direction'] = np.concatenate((state['sweep_direction'], new_sweep_direction))
+    state['sweep_cycle'] = np.concatenate((state['sweep_cycle'], last_cycle + np.cumsum(new_sweep_direction == first_direction)))
+    state['direction'] = int(directions[-1])
+
+    # integrate the new intervals into their sweeps, the same way as integrate_per_sweep
+    interval_integrals = 0.5 * (current[1:] + current[:-1]) * steps
+    if potential_window is not None:
+        is_inside = (potential >= potential_window[0]) & (potential <= potential_window[1])
+        interval_integrals = np.where(is_inside[1:] & is_inside[:-1], interval_integrals, 0.0)
+
+    first_sweep = interval_sweep_index[0]
+    charge = np.bincount(interval_sweep_index - first_sweep, weights=interval_integrals)
+    state['sweep_charge'] = np.concatenate((state['sweep_charge'], np.zeros(len(new_sweep_direction))))
+    state['sweep_charge'][first_sweep:] += charge
+
+    return state
+
+
+def build_charge_index(potential, current, sweep_index):
+    """Builds prefix sums of the integral of current d(potential) over every sweep, with keys ordered by potential,
+    so that the integral over any potential window is a binary search and a subtraction (see query_charge)
+
+    INPUT:
+        potential, current: (n,) arrays in the order they were measured
+
+        sweep_index: (n,) int array from segment_sweeps
+
+    OUTPUT:
+        charge_index: dict of arrays, sorted by sweep and then in the order they were measured. The turning point
+        (the first sample of a sweep) is also the last sample of the sweep before it, as in integrate_per_sweep:
+            'keys':           sweep * key_span + the highest scan potential so far in the sweep - scan_min, sorted, searched with np.searchsorted
+            'scan_potential': potential times the direction of the sweep, increasing through the sweep apart from noise
+            'current':        current
+            'cumulative':     trapezoidal integral of current d(scan potential) from the start of the sweep
+            'starts', 'ends': index of the first and last sample of every sweep
+            'direction':      direction of every sweep, 1 (anodic) or -1 (cathodic)
+            'key_span', 'scan_min': to compute keys of queries
+    """
+
+    potential = np.asarray(potential, dtype=float)
+    current = np.asarray(current, dtype=float)
+    sweep_index = np.asarray(sweep_index)
+    number_of_sweeps = int(sweep_index[-1]) + 1
+
+    turning_points = np.flatnonzero(sweep_index[1:] != sweep_index[:-1]) + 1
+    measured_order = np.concatenate((np.arange(len(potential)), turning_points))
+    potential = np.concatenate((potential, potential[turning_points]))
+    current = np.concatenate((current, current[turning_points]))
+    sweep_index = np.concatenate((sweep_index, sweep_index[turning_points] - 1))
+
+    order = np.lexsort((measured_order, sweep_index))
+    potential, current, sweep_index = potential[order], current[order], sweep_index[order]
+
+    starts = np.searchsorted(sweep_index, np.arange(number_of_sweeps), side='left')
+    ends = np.searchsorted(sweep_index, np.arange(number_of_sweeps), side='right') - 1
+    direction = np.where(potential[ends] < potential[starts], -1, 1)
+    scan_potential = potential * direction[sweep_index]
+
+    # one global prefix sum in the order of the measurement, with no contribution between the last sample of a sweep and the first of the next
+    interval_integrals = 0.5 * (current[1:] + current[:-1]) * np.diff(scan_potential)
+    interval_integrals[sweep_index[1:] != sweep_index[:-1]] = 0.0
+    cumulative = np.concatenate(([0.0], np.cumsum(interval_integrals)))
+
+    # the running maximum keeps the keys sorted where noise steps back within a sweep
+    scan_min = scan_potential.min()
+    key_span = scan_potential.max() - scan_min + 1.0
+    keys = np.maximum.accumulate(sweep_index * key_span + (scan_potential - scan_min))
+
+    return {
+        'keys':           keys,
+        'scan_potential': scan_potential,
+        'current':        current,
+        'cumulative':     cumulative,
+        'starts':         starts,
+        'ends':           ends,
+        'direction':      direction,
+        'key_span':       key_span,
+        'scan_min':       scan_min,
+    }
+
+
+def get_cumulative_at(charge_index, potential, sweeps):
+    """Returns the prefix sum of the sweeps where they first reach the potential, interpolated exactly for the trapezoidal rule.
+    The whole sweep is included beyond its furthest potential and nothing before its start. Arrays broadcast together"""
+    starts, ends = charge_index['starts'][sweeps], charge_index['ends'][sweeps]
+    scan_potential = potential * charge_index['direction'][sweeps]
+    scan_start = charge_index['scan_potential'][starts]
+    scan_end = charge_index['keys'][ends] - sweeps * charge_index['key_span'] + charge_index['scan_min']
+
+    keys = sweeps * charge_index['key_span'] + (scan_potential - charge_index['scan_min'])
+    upper = np.clip(np.searchsorted(charge_index['keys'], keys, side='right'), np.minimum(starts + 1, ends), ends)
+    lower = np.maximum(upper - 1, starts)
+
+    scan_lower, scan_upper = charge_index['scan_potential'][lower], charge_index['scan_potential'][upper]
+    current_lower, current_upper = charge_index['current'][lower], charge_index['current'][upper]
+
+    step = scan_upper - scan_lower
+    fraction = np.divide(scan_potential - scan_lower, step, out=np.zeros(np.broadcast(scan_potential, step).shape), where=step > 0)
+    current_at_potential = current_lower + fraction * (current_upper - current_lower)
+    cumulative = charge_index['cumulative'][lower] + 0.5 * (current_lower + current_at_potential) * (scan_potential - scan_lower)
+
+    cumulative = np.where(scan_potential >= scan_end, charge_index['cumulative'][ends], cumulative)
+    return np.where(scan_potential <= scan_start, charge_index['cumulative'][starts], cumulative)
+
+
+def query_charge(charge_index, windows, sweeps=None):
+    """Integral of current d(potential) over potential windows, for every sweep, in O(log n) per window and sweep
+
+    INPUT:
+        charge_index: dict from build_charge_index
+
+        windows: (start, end) potential, or (m, 2) array of many windows
+
+        sweeps: int array of the sweeps to query (default None, all sweeps)
+
+    OUTPUT:
+        (m, number of sweeps) array, or (number of sweeps,) for a single window, of the integral from start to end in
+        increasing potential, for every sweep, from where the sweep first reaches the start of the window to where it first
+        reaches the end. Windows are cut to the potential range of each sweep. A window over the whole range of a sweep
+        is integrate_per_sweep times the sweep direction, in other windows samples are interpolated at the window edges.
+    """
+
+    windows = np.asarray(windows, dtype=float)
+    is_single_window = windows.ndim == 1
+    windows = np.atleast_2d(windows)
+
+    if sweeps is None:
+        sweeps = np.arange(len(charge_index['starts']))
+    sweeps = np.asarray(sweeps)[np.newaxis, :]
+
+    # the prefix sums are along the sweeps, so a cathodic sweep passes the end of the window before its start
+    charge = get_cumulative_at(charge_index, windows[:, 1:2], sweeps) - get_cumulative_at(charge_index, windows[:, 0:1], sweeps)
+    charge = charge * charge_index['direction'][sweeps]
+    return charge[0] if is_single_window else charge
+
+def get_rolling_nanmean(values, window):
+    """Mean of every run of window columns of a 2D array, along the rows. Runs containing NaN are NaN"""
+    is_nan = np.isnan(values)
+    sums = np.concatenate((np.zeros((values.shape[0], 1)), np.cumsum(np.where(is_nan, 0.0, values), axis=1)), axis=1)
+    nans = np.concatenate((np.zeros((values.shape[0], 1)), np.cumsum(is_nan, axis=1)), axis=1)
+    means = (sums[:, window:] - sums[:, :-window]) / window
+    means[(nans[:, window:] - nans[:, :-window]) > 0] = np.nan
+    return means
+
+
+def get_binned_sweeps(potential, current, sweep_index, sweeps, bin_width):
+    """Mean potential and current of every sweep in bins of bin_width volt, as (number of sweeps, number of bins) arrays with NaN in empty bins"""
+    row = np.searchsorted(sweeps, sweep_index)
+    is_selected = (row < len(sweeps)) & (sweeps[np.minimum(row, len(sweeps) - 1)] == sweep_index)
+    potential, current, row = potential[is_selected], current[is_selected], row[is_selected]
+
+    potential_min = potential.min()
+    number_of_bins = int((potential.max() - potential_min) // bin_width) + 1
+    keys = row * number_of_bins + ((potential - potential_min) // bin_width).astype(np.intp)
+
+    counts = np.bincount(keys, minlength=len(sweeps) * number_of_bins).astype(float)
+    counts[counts == 0] = np.nan
+    binned_potential = np.bincount(keys, weights=potential, minlength=len(counts)) / counts
+    binned_current = np.bincount(keys, weights=current, minlength=len(counts)) / counts
+
+    shape = (len(sweeps), number_of_bins)
+    return binned_potential.reshape(shape), binned_current.reshape(shape)
+
+
+def detect_hupd_window(potential, current, sweep_index, sweep_direction, bin_width=0.005, plateau_width=0.1, plateau_search=(0.3, 0.7), tolerance=0.05):
+    """Finds the hydrogen desorption (H-UPD) window and the double-layer baseline of every anodic sweep, and integrates
+    the current above the baseline over the window. Vectorized over all sweeps, with no plotting
+
+    INPUT:
+        potential, current: (n,) arrays in the order they were measured
+
+        sweep_index, sweep_direction: from segment_sweeps
+
+        bin_width: width in volt of the bins the current is averaged in (default 0.005), should be larger than the potential step
+
+        plateau_width: width in volt of the double-layer plateau (default 0.1)
+
+        plateau_search: (start, end) potential where the center of the double-layer plateau is searched (default (0.3, 0.7))
+
+        tolerance: the window ends where the current, above the desorption peak, has fallen to within this fraction
+                   of (peak - baseline) from the baseline (default 0.05)
+
+    OUTPUT:
+        dict of (number of anodic sweeps,) arrays:
+            'sweeps':            index of the anodic sweeps
+            'baseline':          double-layer current, the lowest mean current over plateau_width within plateau_search
+            'plateau_lower', 'plateau_upper': potential range of that plateau
+            'window_lower':      first potential, from the low end, where the current reaches the baseline
+            'window_upper':      potential where the current above the desorption peak has fallen back to the baseline
+            'charge':            integral of (current - baseline) d(potential) over the window
+    """
+
+    potential = np.asarray(potential, dtype=float)
+    current = np.asarray(current, dtype=float)
+    sweeps = np.flatnonzero(np.asarray(sweep_direction) == 1)
+    rows = np.arange(len(sweeps))
+
+    binned_potential, binned_current = get_binned_sweeps(potential, current, np.asarray(sweep_index), sweeps, bin_width)
+    window = max(1, int(round(plateau_width / bin_width)))
+
+    # Double-layer plateau: the run of bins with the lowest mean current within the search range,
+    # i.e. the valley between the hydrogen desorption and the oxide formation
+    mean_current = get_rolling_nanmean(binned_current, window + 1)
+    plateau_center = get_rolling_nanmean(binned_potential, window + 1)
+    is_searched = (plateau_center >= plateau_search[0]) & (plateau_center <= plateau_search[1]) & ~np.isnan(mean_current)
+    plateau_start = np.argmin(np.where(is_searched, mean_current, np.inf), axis=1)
+    baseline = mean_current[rows, plateau_start]
+
+    plateau_lower = binned_potential[rows, plateau_start]
+    plateau_upper = binned_potential[rows, plateau_start + window]
+
+    # H-UPD window: from where the current first reaches the baseline, past the desorption peak below the plateau,
+    # until the current is back within tolerance of the baseline
+    bins = np.arange(binned_current.shape[1])[np.newaxis, :]
+    below_plateau = np.where(bins < plateau_start[:, np.newaxis], binned_current, np.nan)
+    is_above_baseline = below_plateau >= baseline[:, np.newaxis]
+    lower_bin = np.argmax(is_above_baseline, axis=1)
+
+    peak_bin = np.argmax(np.where(np.isnan(below_plateau), -np.inf, below_plateau), axis=1)
+    threshold = baseline + tolerance * (binned_current[rows, peak_bin] - baseline)
+    is_back_at_baseline = (bins > peak_bin[:, np.newaxis]) & (below_plateau <= threshold[:, np.newaxis])
+    upper_bin = np.where(is_back_at_baseline.any(axis=1), np.argmax(is_back_at_baseline, axis=1), plateau_start)
+
+    window_lower = binned_potential[rows, lower_bin]
+    window_upper = binned_potential[rows, upper_bin]
+
+    # Charge above the baseline, from the prefix sums of the anodic sweeps
+    charge_index = build_charge_index(potential, current, sweep_index)
+    charge = get_cumulative_at(charge_index, window_upper, sweeps) - get_cumulative_at(charge_index, window_lower, sweeps)
+    charge = charge - baseline * (window_upper - window_lower)
+
+    return {
+        'sweeps':        sweeps,
+        'baseline':      baseline,
+        'plateau_lower': plateau_lower,
+        'plateau_upper': plateau_upper,
+        'window_lower':  window_lower,
+        'window_upper':  window_upper,
+        'charge':        charge,
+    }
+
+# EOF #
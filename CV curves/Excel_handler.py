@@ -0,0 +1,201 @@
+##===============================================##
+##        File: Excel_handler.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Useful functions for handling
+##              Excel-workbooks (.xlsx).
+##              Useful functions:
+##               - read_sheets
+##               - extract_sheet_to_CSV
+##               - hash_sheets
+##===============================================##
+
+
+## LIBRARIES ##
+# numpy, pandas, openpyxl, zipfile and CSV_handler are imported in the functions that use them, so that importing this module stays fast
+import itertools
+import posixpath
+import cache_handler
+import instrumentation
+
+## CONSTANTS ##
+EXTRACT_BLOCK_ROWS = 65536 # rows of a sheet converted and written per block in extract_sheet_to_CSV
+XLSX_NAMESPACES = {'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main', 'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'}
+XLSX_RELATIONSHIP_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+XLSX_SHARED_STRINGS = 'xl/sharedStrings.xml'
+
+
+## FUNCTIONS ##
+def cell_to_float(value):
+    """Converts the value of a cell to float, the same way pd.to_numeric(errors='coerce') would: non-numbers become NaN"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return float('nan')
+    return float('nan')
+
+
+def get_sheet_header(header_row, number_of_columns):
+    """Returns the column names of a sheet from its first row, with 'Unnamed: i' for empty cells like pd.read_excel"""
+    header_row = tuple(header_row) + (None,) * (number_of_columns - len(header_row))
+    return [f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header_row)]
+
+
+def get_row_values(rows, number_of_columns):
+    """Converts rows of cells (tuples from iter_rows, possibly shorter than number_of_columns) to a (rows, number_of_columns) float array, with NaN for non-numbers"""
+    import numpy as np
+    values = np.fromiter((cell_to_float(value) for row in rows for value in (tuple(row) + (None,) * (number_of_columns - len(row)))), dtype=float)
+    return values.reshape(-1, number_of_columns)
+
+
+def read_sheets(Excel_file_path, sheet_names, number_of_columns=2, print_message=True):
+    """Reads the first columns of several sheets in a workbook as floats, opening the workbook only once
+
+    INPUT:
+        Excel_file_path: path to the .xlsx-file
+
+        sheet_names: names of the sheets to read, e.g. ['CV aged', 'CV fresh']
+
+        number_of_columns: number of columns, counted from the first, to read in every sheet (default 2)
+
+        print_message: displays a message "DONE: Reading sheets: (...)" with the time it took (default True)
+
+    OUTPUT:
+        dict of sheet name: DataFrame of float64, with the first row of the sheet as header and every column contiguous in memory.
+        Cells that are not numbers are read as NaN and rows with any NaN are dropped.
+
+    The workbook is opened in read-only mode, so rows are streamed from the file instead of loading whole sheets.
+    """
+    import numpy as np
+    import pandas as pd
+    import openpyxl
+
+    sheets = {}
+    with instrumentation.span("Reading sheets", str(list(sheet_names)) + " from " + str(Excel_file_path), print_message=print_message, sheets=len(sheet_names)):
+        workbook = openpyxl.load_workbook(Excel_file_path, read_only=True, data_only=True)
+        try:
+            for sheet_name in sheet_names:
+                rows = workbook[sheet_name].iter_rows(max_col=number_of_columns, values_only=True)
+                header = get_sheet_header(next(rows, ()), number_of_columns)
+
+                values = get_row_values(rows, number_of_columns)
+                keep = ~np.isnan(values).any(axis=1)
+
+                # every column is its own contiguous array, so that series_handler can use it without another copy
+                sheets[sheet_name] = pd.DataFrame({j: values[keep, j] for j in range(number_of_columns)}, copy=False)
+                sheets[sheet_name].columns = header
+        finally:
+            workbook.close()
+
+    return sheets
+
+
+def get_extracted_header(header_rows, sheet_name, number_of_columns):
+    """Column names of an extracted sheet from its last row before the values, e.g. 'Ewe/V' in sheet 'CV fresh' becomes 'Ewe for CV fresh (V)'"""
+    last_row = tuple(header_rows[-1]) if header_rows else ()
+    last_row = last_row + (None,) * (number_of_columns - len(last_row))
+
+    header = []
+    for j, name in enumerate(last_row[:number_of_columns]):
+        name, _, unit = ("Column " + str(j) if name is None else str(name)).partition("/")
+        header.append(f"{name.strip()} for {sheet_name}" + (f" ({unit.strip()})" if unit else ""))
+    return header
+
+
+def extract_sheet_to_CSV(Excel_file_path, sheet_name, CSV_file_path, number_of_columns=2, block_rows=EXTRACT_BLOCK_ROWS, print_message=True):
+    """Streams the rows of a sheet to a CSV-file in the layout CSV_handler.read expects, block_rows at a time, so memory does not grow with the sheet
+
+    INPUT:
+        Excel_file_path: path to the .xlsx-file
+
+        sheet_name: name of the sheet, e.g. 'CV aged'
+
+        CSV_file_path: path to the CSV-file to write
+
+        number_of_columns: number of columns, counted from the first, to extract (default 2)
+
+        block_rows: rows read, converted and written at a time (default EXTRACT_BLOCK_ROWS)
+
+        print_message: displays a message "DONE: Extracting sheet: (...)" with the time it took (default True)
+
+    OUTPUT:
+        number of rows of values written. As in read_sheets, rows with any cell that is not a number are dropped,
+        and the header is made from the last row before the first row of values (see get_extracted_header)
+    """
+    import numpy as np
+    import openpyxl
+    import CSV_handler as CSV
+
+    header, header_rows, number_of_rows = None, [], 0
+    with instrumentation.span("Extracting sheet", f"'{sheet_name}' to '{CSV_file_path}'", print_message=print_message) as record:
+        workbook = openpyxl.load_workbook(Excel_file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet_name].iter_rows(max_col=number_of_columns, values_only=True)
+            for block in iter(lambda: list(itertools.islice(rows, block_rows)), []):
+                values = get_row_values(block, number_of_columns)
+                keep = ~np.isnan(values).any(axis=1)
+
+                if header is None:
+                    # the title and column names are the rows before the first row of values
+                    if not keep.any():
+                        header_rows += block
+                        continue
+                    header_rows += block[:keep.argmax()]
+                    header = get_extracted_header(header_rows, sheet_name, number_of_columns)
+
+                columns = [values[keep, j] for j in range(number_of_columns)]
+                CSV.print_arrays_to_CSV(CSV_file_path, *[item for pair in zip(header, columns) for item in pair], append=number_of_rows > 0)
+                number_of_rows += len(columns[0])
+        finally:
+            workbook.close()
+
+        if header is None: # no values at all, only the header is written
+            header = get_extracted_header(header_rows, sheet_name, number_of_columns)
+            CSV.print_arrays_to_CSV(CSV_file_path, *[item for name in header for item in (name, [])])
+        record['fields'].update(rows=number_of_rows)
+
+    return number_of_rows
+
+
+def get_sheet_parts(Excel_file_path):
+    """Returns a dict of sheet name: path of its XML-part in the .xlsx-file (which is a zip-file), e.g. {'CV aged': 'xl/worksheets/sheet4.xml'}"""
+    import zipfile
+    from xml.etree import ElementTree
+
+    with zipfile.ZipFile(Excel_file_path) as archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        relationships = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+
+    targets = {relationship.get('Id'): relationship.get('Target') for relationship in relationships.findall('rel:Relationship', XLSX_NAMESPACES)}
+    parts = {}
+    for sheet in workbook.findall('main:sheets/main:sheet', XLSX_NAMESPACES):
+        target = targets[sheet.get(XLSX_RELATIONSHIP_ID)]
+        parts[sheet.get('name')] = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+    return parts
+
+
+def hash_sheets(Excel_file_path):
+    """Returns a dict of sheet name: hex digest of the content of the sheet, without parsing any cells
+
+    The digest is of the XML-part of the sheet and the shared strings its text cells refer to, so a sheet keeps its digest
+    when only other sheets change, as long as no text does. Hashed with cache_handler.hash_stream_content.
+    """
+    import zipfile
+
+    hashes = {}
+    with zipfile.ZipFile(Excel_file_path) as archive:
+        has_shared_strings = XLSX_SHARED_STRINGS in archive.namelist()
+        for sheet_name, part in get_sheet_parts(Excel_file_path).items():
+            with archive.open(part) as sheet_stream:
+                if has_shared_strings:
+                    with archive.open(XLSX_SHARED_STRINGS) as shared_strings_stream:
+                        hashes[sheet_name] = cache_handler.hash_stream_content(sheet_stream, shared_strings_stream)
+                else:
+                    hashes[sheet_name] = cache_handler.hash_stream_content(sheet_stream)
+    return hashes
+
+# EOF #
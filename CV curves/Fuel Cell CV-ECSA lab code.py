@@ -1,28 +1,42 @@
 import numpy as np
-from scipy import integrate
-import pandas as pd
-import matplotlib.pyplot as plt
+import cache_handler
+import Excel_handler
+import series_handler
+import CV_analysis
+import instrumentation
+
+def load_sheets(file_path, sheet_names):
+    # Load the numeric data of every sheet, from the cache if the workbook is unchanged since the last run
+    sheets = {sheet_name: cache_handler.lookup(file_path, {'sheet_name': sheet_name}) for sheet_name in sheet_names}
+
+    # The sheets that are not cached are all read in one pass over the workbook
+    missing_sheet_names = [sheet_name for sheet_name, data in sheets.items() if data is None]
+    if missing_sheet_names:
+        for sheet_name, data in Excel_handler.read_sheets(file_path, missing_sheet_names, number_of_columns=2).items():
+            cache_handler.store(file_path, data, {'sheet_name': sheet_name})
+            sheets[sheet_name] = data
+
+    return sheets
+
+def calculate_ecsa(file_path, sheet_name, sheets=None, dtype=None):
+    # Use the already loaded sheets if given, otherwise load this sheet only
+    if sheets is None:
+        sheets = load_sheets(file_path, [sheet_name])
+    data = sheets[sheet_name]
+
+    # Extract potential (E) and current (i) data as contiguous arrays, dtype='float32' halves the memory
+    potential = series_handler.from_column(data, 0, unit='V', dtype=dtype)  # First column (Voltage), a view of the sheet if the dtype is the same
+    current = series_handler.from_column(data, 1, unit='mA', dtype=dtype)  # Second column (milliamps)
+    series_handler.convert_unit(current, 'A')  # Amps, in place: the only copy of the data
+
+    return potential['values'], current['values']
+
+def plot_and_calculate_ecsa(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_range, sheets=None, plot=True):
+    # scipy and matplotlib are only imported here, so that compute-only runs start fast and never load pyplot
+    from scipy import integrate
 
-def calculate_ecsa(file_path, sheet_name):
-    # Load data from the Excel file
-    data = pd.read_excel(file_path, sheet_name=sheet_name)
-
-    # Convert data in the first and second columns to numeric as float
-    data.iloc[:, 0] = pd.to_numeric(data.iloc[:, 0], errors='coerce').astype(float)  # Assuming 'Potential' is in the first column
-    data.iloc[:, 1] = pd.to_numeric(data.iloc[:, 1], errors='coerce').astype(float)  # Assuming 'Current' is in the second column
-
-    # Drop rows with NaN values
-    data = data.dropna()
-
-    # Extract potential (E) and current (i) data
-    potential = data.iloc[:, 0]  # First column (Voltage)
-    current = data.iloc[:, 1]/1000  # Second column (Amps)
-
-    return potential, current
-
-def plot_and_calculate_ecsa(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_range):
     # Calculate ECSA for the sample
-    potential, current = calculate_ecsa(file_path, sheet_name)
+    potential, current = calculate_ecsa(file_path, sheet_name, sheets)
 
     # Filter data based on the specified potential range
     mask = (potential >= integration_range[0]) & (potential <= integration_range[1])
@@ -30,18 +44,21 @@ def plot_and_calculate_ecsa(file_path, sheet_name, electrode_area, surface_load,
     current_range = current[mask]
 
     # Plot the cyclic voltammogram with the specified integration range
-    plt.figure(figsize=(8, 5))
-    plt.plot(potential, current, label=f'Cyclic Voltammogram - {sheet_name}')
-    plt.axvspan(min(potential_range), max(potential_range), color='red', alpha=0.3, label='Integration Range')
-    plt.xlabel('Potential (V)')
-    plt.ylabel('Current (A)')
-    plt.title(f'Cyclic Voltammogram - {sheet_name}')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    if plot:
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(8, 5))
+        plt.plot(potential, current, label=f'Cyclic Voltammogram - {sheet_name}')
+        plt.axvspan(potential_range.min(), potential_range.max(), color='red', alpha=0.3, label='Integration Range')
+        plt.xlabel('Potential (V)')
+        plt.ylabel('Current (A)')
+        plt.title(f'Cyclic Voltammogram - {sheet_name}')
+        plt.legend()
+        plt.grid(True)
+        plt.show()
 
     # Integrate the current with respect to potential within the specified range to obtain charge (Q)
-    charge = integrate.simps(current_range, potential_range) #Units of Coulomb (C)
+    with instrumentation.span("Integrating charge", sheet_name):
+        charge = integrate.simpson(current_range, x=potential_range) #Units of Coulomb (C), simps was removed in SciPy 1.14
     theta = surface_charge #Coulomb per m2
     load = surface_load
     area = electrode_area
@@ -49,23 +66,85 @@ def plot_and_calculate_ecsa(file_path, sheet_name, electrode_area, surface_load,
 
     return ECSA
 
-# Example usage
-file_path = 'Fuel cell lab 121222 Data.xlsx'
-electrode_area = 0.0005  # Area of the platinum electrode, 5 m2
-surface_load = 4  # Surface load, 4 grams per m2
-surface_charge = 2.1  # Surface charge of a full proton layer on polycrystalline Pt, Coulomb/m2..
+def calculate_ecsa_per_sweep(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_range, sheets=None):
+    # Split the CV into sweeps and cycles, so that anodic and cathodic sweeps are not integrated together
+    potential, current = calculate_ecsa(file_path, sheet_name, sheets)
+    with instrumentation.span("Integrating charge per sweep", sheet_name):
+        sweep_index, sweep_direction, sweep_cycle = CV_analysis.segment_sweeps(potential)
+
+        # Integrate every sweep separately within the specified range, the sign is flipped for cathodic sweeps
+        charge = CV_analysis.integrate_per_sweep(potential, current, sweep_index, integration_range) * sweep_direction
+    ECSA = charge/(surface_charge*surface_load*electrode_area)
+
+    return ECSA, sweep_direction, sweep_cycle
+
+def calculate_ecsa_for_integration_ranges(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_ranges, sheets=None):
+    # Prefix sums of the charge of every sweep, so that every integration range is only a lookup
+    potential, current = calculate_ecsa(file_path, sheet_name, sheets)
+    with instrumentation.span("Integrating charge for integration ranges", f"{sheet_name}, {len(integration_ranges)} ranges"):
+        sweep_index, sweep_direction, sweep_cycle = CV_analysis.segment_sweeps(potential)
+        charge_index = CV_analysis.build_charge_index(potential, current, sweep_index)
+
+        # ECSA of every anodic sweep (columns) for every integration range (rows)
+        charge = CV_analysis.query_charge(charge_index, integration_ranges, sweeps=np.flatnonzero(sweep_direction == 1))
+    ECSA = charge/(surface_charge*surface_load*electrode_area)
+
+    return ECSA
+
+def calculate_ecsa_auto(file_path, sheet_name, electrode_area, surface_load, surface_charge, sheets=None):
+    # Detect the hydrogen desorption window and subtract the double-layer baseline in every anodic sweep, without plotting
+    potential, current = calculate_ecsa(file_path, sheet_name, sheets)
+    with instrumentation.span("Detecting H-UPD window", sheet_name):
+        sweep_index, sweep_direction, sweep_cycle = CV_analysis.segment_sweeps(potential)
+        hupd = CV_analysis.detect_hupd_window(potential, current, sweep_index, sweep_direction)
+
+    ECSA = hupd['charge']/(surface_charge*surface_load*electrode_area)
+
+    return ECSA, hupd
+
+# Example usage, when run as a script (the functions above can be used without running it)
+if __name__ == '__main__':
+    file_path = 'Fuel cell lab 121222 Data.xlsx'
+    electrode_area = 0.0005  # Area of the platinum electrode, 5 m2
+    surface_load = 4  # Surface load, 4 grams per m2
+    surface_charge = 2.1  # Surface charge of a full proton layer on polycrystalline Pt, Coulomb/m2..
+    show_plots = True  # False for compute-only runs, matplotlib is then never imported
+    print_profile = False  # True prints the time (and peak memory, with TIF351_TRACE_MEMORY=1) of every stage at the end
+
+    # Load both sheets in one pass over the workbook
+    sheets = load_sheets(file_path, ['CV aged', 'CV fresh'])
+
+    # Specify the integration range for the old sample (start and end potentials)
+    integration_range_old = (0, 0.5)  # Replace with the desired range
+
+    # Calculate and plot ECSA for the "old" sample
+    old_sample_ecsa = plot_and_calculate_ecsa(file_path, 'CV aged', electrode_area, surface_load, surface_charge, integration_range_old, sheets, show_plots)
+
+    # Specify the integration range for the new sample (start and end potentials)
+    integration_range_new = (0, 0.5)  # Replace with the desired range
+
+    # Calculate and plot ECSA for the "new" sample
+    new_sample_ecsa = plot_and_calculate_ecsa(file_path, 'CV fresh', electrode_area, surface_load, surface_charge, integration_range_new, sheets, show_plots)
 
-# Specify the integration range for the old sample (start and end potentials)
-integration_range_old = (0, 0.5)  # Replace with the desired range
+    print(f'ECSA (Old Sample): {old_sample_ecsa:.6f} m²/g')
+    print(f'ECSA (New Sample): {new_sample_ecsa:.6f} m²/g')
 
-# Calculate and plot ECSA for the "old" sample
-old_sample_ecsa = plot_and_calculate_ecsa(file_path, 'CV aged', electrode_area, surface_load, surface_charge, integration_range_old)
+    # ECSA of every sweep, averaged over the anodic (hydrogen desorption) sweeps
+    for sample, sheet_name, integration_range in [('Old', 'CV aged', integration_range_old), ('New', 'CV fresh', integration_range_new)]:
+        sweep_ecsa, sweep_direction, sweep_cycle = calculate_ecsa_per_sweep(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_range, sheets)
+        print(f'ECSA per anodic sweep ({sample} Sample): {sweep_ecsa[sweep_direction == 1].round(6)} m²/g, mean {sweep_ecsa[sweep_direction == 1].mean():.6f} m²/g over {sweep_cycle[-1] + 1} cycles')
 
-# Specify the integration range for the new sample (start and end potentials)
-integration_range_new = (0, 0.5)  # Replace with the desired range
+    # Sensitivity of the mean anodic ECSA to the upper integration limit
+    upper_limits = np.linspace(0.4, 0.6, 1001)
+    for sample, sheet_name, integration_range in [('Old', 'CV aged', integration_range_old), ('New', 'CV fresh', integration_range_new)]:
+        integration_ranges = np.column_stack((np.full_like(upper_limits, integration_range[0]), upper_limits))
+        mean_ecsa = calculate_ecsa_for_integration_ranges(file_path, sheet_name, electrode_area, surface_load, surface_charge, integration_ranges, sheets).mean(axis=1)
+        print(f'Mean anodic ECSA ({sample} Sample) for upper limits {upper_limits[0]:.2f}-{upper_limits[-1]:.2f} V: {mean_ecsa.min():.6f}-{mean_ecsa.max():.6f} m²/g')
 
-# Calculate and plot ECSA for the "new" sample
-new_sample_ecsa = plot_and_calculate_ecsa(file_path, 'CV fresh', electrode_area, surface_load, surface_charge, integration_range_new)
+    # ECSA with the detected window and the double-layer baseline subtracted
+    for sample, sheet_name in [('Old', 'CV aged'), ('New', 'CV fresh')]:
+        auto_ecsa, hupd = calculate_ecsa_auto(file_path, sheet_name, electrode_area, surface_load, surface_charge, sheets)
+        print(f'ECSA with detected window ({sample} Sample): mean {auto_ecsa.mean():.6f} m²/g, window {hupd["window_lower"].mean():.3f}-{hupd["window_upper"].mean():.3f} V, baseline {hupd["baseline"].mean():.6f} A')
 
-print(f'ECSA (Old Sample): {old_sample_ecsa:.6f} m²/g')
-print(f'ECSA (New Sample): {new_sample_ecsa:.6f} m²/g')
\ No newline at end of file
+    if print_profile:
+        instrumentation.print_profile_report()
@@ -0,0 +1,184 @@
+##===============================================##
+##        File: cache_handler.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Persistent binary cache of parsed
+##              CSV-files and Excel-sheets.
+##              Every column is stored as a .npy
+##              file that is memory-mapped when
+##              loaded again.
+##              Useful functions:
+##               - load
+##               - lookup, store
+##               - clear
+##               - hash_file_content
+##===============================================##
+
+
+## LIBRARIES ##
+import os
+import json
+import shutil
+import hashlib
+# numpy and pandas are imported in the functions that use them, hashing a file does not need them
+
+## CONSTANTS ##
+CACHE_DIRECTORY = os.environ.get("TIF351_CACHE_DIRECTORY", os.path.join(os.path.expanduser("~"), ".cache", "TIF351_fuel_cell_lab"))
+CACHE_MAX_BYTES = 2**30 # least recently used entries are evicted above this total size
+HASH_BLOCK_BYTES = 2**20
+METADATA_FILENAME = "metadata.json"
+
+
+## FUNCTIONS ##
+def hash_file_content(file_path):
+    """Returns a hex digest of the content of a file, read in blocks of HASH_BLOCK_BYTES"""
+    with open(file_path, 'rb') as file:
+        return hash_stream_content(file)
+
+
+def hash_stream_content(*streams):
+    """Returns a hex digest of the content of one or more open binary files, e.g. parts of a zip-file, read in blocks of HASH_BLOCK_BYTES"""
+    file_hash = hashlib.blake2b(digest_size=16)
+    for stream in streams:
+        for block in iter(lambda: stream.read(HASH_BLOCK_BYTES), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_entry_path(source_path, key_options):
+    """Returns the cache directory of one source file read with one set of options (e.g. sheet name, columns, dtype)"""
+    key = json.dumps([os.path.abspath(source_path), key_options], sort_keys=True, default=str)
+    return os.path.join(CACHE_DIRECTORY, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest())
+
+
+def read_entry(entry_path, source_path):
+    """Returns the cached DataFrame of an entry, or None if there is none or the source file has changed since it was stored"""
+    metadata_path = os.path.join(entry_path, METADATA_FILENAME)
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as metadata_file:
+            metadata = json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+    source_stat = os.stat(source_path)
+    if source_stat.st_size != metadata["size"]:
+        return None
+
+    if source_stat.st_mtime_ns != metadata["mtime_ns"]:
+        # touched but maybe not changed, only trust the entry if the content is the same
+        if hash_file_content(source_path) != metadata["content_hash"]:
+            return None
+        metadata["mtime_ns"] = source_stat.st_mtime_ns
+        with open(metadata_path, 'w', encoding='utf-8') as metadata_file:
+            json.dump(metadata, metadata_file)
+
+    import numpy as np
+    import pandas as pd
+    try:
+        # copy-on-write: the columns are writable like a parsed DataFrame, changes stay in memory and never reach the cache
+        columns = [np.load(os.path.join(entry_path, f"column_{i}.npy"), mmap_mode='c') for i in range(len(metadata["header"]))]
+    except (OSError, ValueError):
+        return None
+
+    os.utime(metadata_path) # marks the entry as recently used for the eviction
+    data = pd.DataFrame(dict(enumerate(columns)), copy=False)
+    data.columns = metadata["header"]
+    return data
+
+
+def write_entry(entry_path, source_path, data):
+    """Stores every column of a numeric DataFrame as a .npy file. Non-numeric DataFrames are not cached"""
+    import numpy as np
+    import pandas as pd
+    # pandas extension dtypes (text is StringDtype in pandas 3, nullable Int64, ...) are not NumPy dtypes and can not be memory-mapped
+    if not all(isinstance(dtype, np.dtype) and pd.api.types.is_numeric_dtype(dtype) for dtype in data.dtypes):
+        return
+
+    source_stat = os.stat(source_path)
+    metadata = {
+        "source_path":  os.path.abspath(source_path),
+        "size":         source_stat.st_size,
+        "mtime_ns":     source_stat.st_mtime_ns,
+        "content_hash": hash_file_content(source_path),
+        "header":       [str(header) for header in data.columns],
+    }
+
+    # written to a temporary directory first, so other processes never see half an entry
+    temporary_path = f"{entry_path}.tmp-{os.getpid()}"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+    for i in range(data.shape[1]):
+        np.save(os.path.join(temporary_path, f"column_{i}.npy"), np.ascontiguousarray(data.iloc[:, i].to_numpy()))
+    with open(os.path.join(temporary_path, METADATA_FILENAME), 'w', encoding='utf-8') as metadata_file:
+        json.dump(metadata, metadata_file)
+
+    shutil.rmtree(entry_path, ignore_errors=True)
+    try:
+        os.rename(temporary_path, entry_path)
+    except OSError:
+        shutil.rmtree(temporary_path, ignore_errors=True) # another process stored the same entry first
+
+    evict(CACHE_MAX_BYTES)
+
+
+def get_entry_size(entry_path):
+    return sum(entry.stat().st_size for entry in os.scandir(entry_path) if entry.is_file())
+
+
+def evict(max_bytes):
+    """Removes the least recently used entries until the cache is at most max_bytes large"""
+    entries = []
+    for entry in os.scandir(CACHE_DIRECTORY):
+        metadata_path = os.path.join(entry.path, METADATA_FILENAME)
+        if entry.is_dir() and os.path.exists(metadata_path):
+            entries.append((os.stat(metadata_path).st_mtime, get_entry_size(entry.path), entry.path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_bytes -= size
+
+
+def lookup(source_path, key_options=None):
+    """Returns the cached DataFrame of a file read with key_options, or None if it is not cached or the file has changed"""
+    return read_entry(get_entry_path(source_path, key_options), source_path)
+
+
+def store(source_path, data, key_options=None):
+    """Caches the DataFrame parsed from a file read with key_options. Failing to write the cache only prints a warning"""
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        write_entry(get_entry_path(source_path, key_options), source_path, data)
+    except OSError as error:
+        print(f"WARNING: could not cache '{source_path}': {error}")
+
+
+def load(source_path, parse, key_options=None):
+    """Returns the DataFrame parsed from a file, from the cache if the file is unchanged since it was last parsed
+
+    INPUT:
+        source_path: path to the CSV- or Excel-file
+
+        parse: function without arguments that parses the file and returns a DataFrame, called on a cache miss
+
+        key_options: anything JSON-like that changes what parse returns, e.g. {'sheet_name': 'CV aged'} (default None)
+
+    OUTPUT:
+        DataFrame, with copy-on-write memory-mapped columns on a cache hit (writable, but changes are not written to the cache)
+    """
+
+    data = lookup(source_path, key_options)
+    if data is None:
+        data = parse()
+        store(source_path, data, key_options)
+    return data
+
+
+def clear():
+    """Removes every entry in the cache"""
+    shutil.rmtree(CACHE_DIRECTORY, ignore_errors=True)
+
+# EOF #
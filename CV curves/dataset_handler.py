@@ -0,0 +1,182 @@
+##===============================================##
+##        File: dataset_handler.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Datasets of several named series
+##              of different lengths (e.g. a fresh
+##              and an aged sample), each stored at
+##              its own length with its unit and
+##              sample label, instead of side by
+##              side in a NaN-padded CSV-file.
+##              On disk (.dataset) a JSON header is
+##              followed by the raw values of every
+##              series, which are memory-mapped
+##              when loaded, so nothing is parsed.
+##              Converts losslessly to and from the
+##              CSV layout of print_arrays_to_CSV.
+##              Useful functions:
+##               - make_dataset, get_series
+##               - from_CSV, to_CSV
+##               - save, load
+##===============================================##
+
+
+## LIBRARIES ##
+# numpy is imported in the functions that use it, so that importing this module stays fast
+import os
+import re
+import json
+import CSV_handler as CSV
+import series_handler
+import instrumentation
+
+## CONSTANTS ##
+DATASET_EXTENSION = ".dataset"
+DATASET_MAGIC = b"TIF351 dataset 1\n"
+DATASET_ALIGNMENT = 64 # bytes, every series starts at a multiple of this, so it can be viewed as its dtype without a copy
+HEADER_PATTERN = re.compile(r"^(?P<name>.*?)\s*\((?P<unit>[^()]*)\)\s*$") # 'Potential for fresh sample (V)'
+
+
+## FUNCTIONS ##
+def make_dataset(series, metadata=None):
+    """Makes a dataset of a list of series (dicts from series_handler.make_series), in the order of the columns of the CSV-layout
+
+    INPUT:
+        series: list of series, each with its own length
+
+        metadata: dict of anything JSON-like about the whole dataset, e.g. the date of the measurement (default None, {})
+
+    OUTPUT:
+        dict with 'series' (list of series) and 'metadata' (dict)
+    """
+    return {'series': list(series), 'metadata': dict(metadata or {})}
+
+
+def get_series(dataset, column, dtype=None):
+    """Returns a series of a dataset by position (int) or name, as a new series dict with a view of its values if the dtype is the same.
+    Conversions of the returned series (series_handler.scale, ...) do not change the dataset"""
+    if isinstance(column, str):
+        names = [series['name'] for series in dataset['series']]
+        if column not in names:
+            raise KeyError(f"WARNING: no series named '{column}' in the dataset, the series are: {names}")
+        column = names.index(column)
+
+    series = dataset['series'][column]
+    return series_handler.make_series(series['values'], name=series['name'], unit=series['unit'], dtype=dtype, label=series['label'])
+
+
+def parse_header(header):
+    """Returns the unit and the sample label of a CSV-header like 'Current for polarization curve for fresh sample (mA)': ('mA', 'fresh sample').
+    The unit is the text in the last parentheses and the label the text after the last ' for ', both '' if there are none"""
+    match = HEADER_PATTERN.match(header)
+    name, unit = (match.group('name'), match.group('unit')) if match else (header, '')
+    label = name.rsplit(' for ', 1)[1] if ' for ' in name else ''
+    return unit, label
+
+
+def from_CSV(CSV_file_path, dtype=None, print_message=True):
+    """Reads a CSV-file with series side by side (the layout of print_arrays_to_CSV) as a dataset.
+    The empty cells at the end of shorter columns are dropped, the unit and sample label of every series are taken from its header
+
+    INPUT:
+        CSV_file_path: path to the CSV-file
+
+        dtype: dtype of the values, e.g. 'float32' (default None, float64)
+
+        print_message: displays a message "DONE: Reading CSV: (...)" (default True)
+
+    OUTPUT:
+        dataset dict, see make_dataset. Every series is a view of the column it was read from if the dtype is the same.
+        A measured NaN at the end of a column can not be told apart from the padding in the CSV-layout, and is dropped as well.
+    """
+    import numpy as np
+
+    CSV_data = CSV.read(CSV_file_path, print_message=print_message)
+
+    series = []
+    for column in range(CSV_data.shape[1]):
+        column_series = series_handler.from_column(CSV_data, column, dtype=dtype)
+        column_series['unit'], column_series['label'] = parse_header(column_series['name'])
+
+        is_measured = ~np.isnan(column_series['values'])
+        column_series['values'] = column_series['values'][:len(is_measured) - np.argmax(is_measured[::-1]) if is_measured.any() else 0]
+        series.append(column_series)
+
+    return make_dataset(series, {'source': os.path.basename(CSV_file_path)})
+
+
+def to_CSV(dataset, CSV_file_path, print_message=False):
+    """Prints a dataset to a CSV-file with the series side by side, shorter ones padded with empty cells, as print_arrays_to_CSV"""
+    columns = []
+    for series in dataset['series']:
+        columns += [series['name'], series['values']]
+    CSV.print_arrays_to_CSV(CSV_file_path, *columns, print_message=print_message)
+
+
+def get_aligned(position):
+    return -(-position // DATASET_ALIGNMENT) * DATASET_ALIGNMENT
+
+
+def save(dataset, dataset_path, print_message=False):
+    """Writes a dataset to a .dataset-file: a magic line, one line of JSON with the metadata, unit, label, dtype, length
+    and position of every series, and then the values of every series, in the order of the series
+
+    INPUT:
+        dataset: dataset dict, see make_dataset
+
+        dataset_path: path to the file, ending with .dataset
+
+        print_message: displays a message "DONE: Writing dataset: (...)" (default False)
+    """
+    import numpy as np
+
+    header = {'metadata': dataset['metadata'], 'series': []}
+    offset = 0
+    for series in dataset['series']:
+        values = series['values']
+        header['series'].append({'name': series['name'], 'unit': series['unit'], 'label': series.get('label', ''),
+                                 'dtype': values.dtype.newbyteorder('<').str, 'length': len(values), 'offset': offset})
+        offset = get_aligned(offset + values.nbytes)
+
+    header_bytes = DATASET_MAGIC + json.dumps(header, default=str).encode('utf-8') + b"\n"
+    data_start = get_aligned(len(header_bytes))
+
+    with instrumentation.span("Writing dataset", dataset_path, print_message=print_message, series=len(dataset['series'])), \
+         open(dataset_path, 'wb') as dataset_file:
+        dataset_file.write(header_bytes + b"\0" * (data_start - len(header_bytes)))
+
+        for series, series_header in zip(dataset['series'], header['series']):
+            dataset_file.seek(data_start + series_header['offset'])
+            dataset_file.write(memoryview(np.ascontiguousarray(series['values'], dtype=series_header['dtype'])).cast('B'))
+        dataset_file.truncate(data_start + offset)
+
+
+def load(dataset_path, print_message=True):
+    """Loads a .dataset-file written by save. The values are memory-mapped and read-only, so loading takes the same time
+    for any length of the series, and only the parts of the file that are used are read from disk
+
+    OUTPUT:
+        dataset dict, see make_dataset
+    """
+    import numpy as np
+
+    with instrumentation.span("Reading dataset", dataset_path, print_message=print_message):
+        with open(dataset_path, 'rb') as dataset_file:
+            if dataset_file.readline() != DATASET_MAGIC:
+                raise ValueError(f"WARNING: not a dataset file (or of another version): {dataset_path}")
+            header_line = dataset_file.readline()
+        header = json.loads(header_line)
+        data_start = get_aligned(len(DATASET_MAGIC) + len(header_line))
+
+        file_bytes = np.memmap(dataset_path, dtype=np.uint8, mode='r') if os.path.getsize(dataset_path) > data_start else np.zeros(0, dtype=np.uint8)
+        series = []
+        for series_header in header['series']:
+            dtype = np.dtype(series_header['dtype'])
+            start = data_start + series_header['offset']
+            values = file_bytes[start:start + series_header['length'] * dtype.itemsize].view(dtype)
+            series.append(series_handler.make_series(values, name=series_header['name'], unit=series_header['unit'], dtype=dtype, label=series_header['label']))
+
+    return make_dataset(series, header['metadata'])
+
+# EOF #
@@ -0,0 +1,179 @@
+##===============================================##
+##        File: figure_spec.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Build figures from declarative
+##              specs (.figure.json or .toml) with
+##              the helpers in functions.py.
+##              A figure is only rebuilt when the
+##              hash of its spec, its CSV-file or
+##              the plotting code has changed.
+##              The data can also be a .dataset-file
+##              (dataset_handler.py) instead of CSV.
+##              Useful functions:
+##               - build_figure
+##               - load_series
+##===============================================##
+
+
+## LIBRARIES ##
+import os
+import json
+import hashlib
+import CSV_handler as CSV
+import functions as f
+import cache_handler
+import series_handler
+import dataset_handler
+import instrumentation
+
+## CONSTANTS ##
+CODE_PATHS = [os.path.abspath(__file__), os.path.abspath(f.__file__), os.path.abspath(CSV.__file__), os.path.abspath(series_handler.__file__), os.path.abspath(dataset_handler.__file__)]
+
+
+## FUNCTIONS ##
+def load_spec(spec_path):
+    """Reads a figure spec from a .json- or .toml-file (.toml needs Python 3.11 or newer)"""
+    if spec_path.endswith(".toml"):
+        import tomllib
+        with open(spec_path, 'rb') as spec_file:
+            return tomllib.load(spec_file)
+
+    with open(spec_path, 'r', encoding='utf-8') as spec_file:
+        return json.load(spec_file)
+
+
+def get_spec_paths(spec, spec_path):
+    """Returns the paths to the CSV- and PDF-file of a spec, relative to the folder of the spec"""
+    folder = os.path.dirname(os.path.abspath(spec_path))
+    return os.path.join(folder, spec["CSV"]), os.path.join(folder, spec["PDF"])
+
+
+def get_spec_hash(spec, CSV_path):
+    """Hash of the spec, the content of its CSV-file and the plotting code, so any change of them gives a new hash"""
+    spec_hash = hashlib.blake2b(digest_size=16)
+    spec_hash.update(json.dumps(spec, sort_keys=True).encode('utf-8'))
+    for path in [CSV_path] + CODE_PATHS:
+        spec_hash.update(cache_handler.hash_file_content(path).encode('utf-8'))
+    return spec_hash.hexdigest()
+
+
+def get_hash_path(PDF_path):
+    """The hash of the last build of a PDF is kept in a hidden file next to it"""
+    folder, filename = os.path.split(PDF_path)
+    return os.path.join(folder, "." + filename + ".hash")
+
+
+def is_up_to_date(PDF_path, spec_hash):
+    try:
+        with open(get_hash_path(PDF_path), 'r', encoding='utf-8') as hash_file:
+            return os.path.exists(PDF_path) and hash_file.read().strip() == spec_hash
+    except OSError:
+        return False
+
+
+def read_data(CSV_path):
+    """Reads the data of a spec: a dataset if the file is a .dataset-file, otherwise a DataFrame of the CSV-file"""
+    if CSV_path.endswith(dataset_handler.DATASET_EXTENSION):
+        return dataset_handler.load(CSV_path)
+    return CSV.read(CSV_path)
+
+
+def get_series_data(CSV_data, axis_spec, area):
+    """Returns a column of the CSV-data (DataFrame or dataset) as an array, with its sign flipped and divided by the area if the spec says so.
+    The column is copied at most once (by series_handler), and only if it has to be scaled"""
+    if isinstance(CSV_data, dict): # dataset, every series at its own length
+        series = dataset_handler.get_series(CSV_data, axis_spec["column"], dtype=axis_spec.get("dtype"))
+    else:
+        series = series_handler.from_column(CSV_data, axis_spec["column"], dtype=axis_spec.get("dtype"))
+    scale = axis_spec.get("sign", 1) / (area if axis_spec.get("divide_by_area", False) else 1)
+    return series_handler.scale(series, scale)['values']
+
+
+def load_series(spec_path):
+    """Returns the labels and the x- and y-data of every series of a spec, as they are plotted (sign and area applied)"""
+    spec = load_spec(spec_path)
+    CSV_path, _ = get_spec_paths(spec, spec_path)
+    CSV_data = read_data(CSV_path)
+
+    labels, x_data, y_data = [], [], []
+    for series in spec["series"]:
+        labels.append(series.get("label", os.path.basename(spec_path)))
+        x_data.append(get_series_data(CSV_data, series["x"], spec.get("area", 1)))
+        y_data.append(get_series_data(CSV_data, series["y"], spec.get("area", 1)))
+    return labels, x_data, y_data
+
+
+def plot_figure(spec, CSV_path):
+    """Plots the figure of a spec with the helpers in functions.py, the same way as the plotting scripts did. Returns the figure"""
+    import matplotlib.pyplot as plt # only when a figure is plotted, not when it is up to date
+    CSV_data = read_data(CSV_path)
+
+    f.set_LaTeX_and_CMU(True, mode=spec.get("text_mode", "latex")) #must be before plotting
+    figure_size_cm = spec.get("figure_size_cm", [16, 9])
+    fig, axs = plt.subplots(nrows=1, ncols=1, figsize=(f.cm_2_inch(figure_size_cm[0]), f.cm_2_inch(figure_size_cm[1])), sharex=False, sharey=False)
+
+    # Plot every series
+    for series in spec["series"]:
+        x_data = get_series_data(CSV_data, series["x"], spec.get("area", 1))
+        y_data = get_series_data(CSV_data, series["y"], spec.get("area", 1))
+        x_data, y_data = f.downsample_min_max(x_data, y_data, spec.get("max_points_per_series"))
+        axs.plot(x_data, y_data, color=series.get("color"), label=series.get("label"), **spec.get("marker", {}))
+
+    # Settings for each axis
+    font_size, scale, labels, invert = spec["font_size"], spec["axis_scale"], spec["axis_labels"], spec["axis_invert"]
+    x_lim, y_lim, grid, legend = spec["axis_limits"]["x"], spec["axis_limits"]["y"], spec["grid"], spec["legend"]
+    f.set_font_size(axis=font_size["axis"], tick=font_size["tick"], legend=font_size["legend"])
+    f.set_axis_scale(   axs, xScale_string=scale["x"], yScale_string=scale["y"])
+    f.set_axis_labels(  axs, x_label=labels["x"], y_label=labels["y"])
+    f.set_axis_invert(  axs, x_invert=invert["x"], y_invert=invert["y"])
+    f.set_axis_limits(  axs, x_lim[0], x_lim[1], y_lim[0], y_lim[1])
+    f.set_grid(         axs, grid_major_on=grid["major_on"], grid_major_linewidth=grid["major_linewidth"], grid_minor_on=grid["minor_on"], grid_minor_linewidth=grid["minor_linewidth"]) # set_grid must be after set_axis_scale for some reason (at least with 'log')
+    f.set_legend(       axs, legend_on=legend["on"], alpha=legend["alpha"], location=legend["location"])
+
+    f.align_labels(fig)
+    f.set_layout_tight(fig)
+    return fig
+
+
+def build_figure(spec_path, force=False, show=False):
+    """Builds the PDF of a figure spec, if the spec, its CSV-file or the plotting code changed since the last build
+
+    INPUT:
+        spec_path: path to the .figure.json- or .toml-file, the CSV- and PDF-file in it are relative to its folder
+
+        force: rebuilds the PDF even if nothing changed (default False)
+
+        show: shows the figure in a window, it is then plotted even if the PDF is up to date (default False)
+
+    OUTPUT:
+        dict with 'status' ('built' or 'unchanged') and 'PDF_path'
+    """
+
+    spec = load_spec(spec_path)
+    CSV_path, PDF_path = get_spec_paths(spec, spec_path)
+    spec_hash = get_spec_hash(spec, CSV_path)
+    status = "unchanged" if not force and is_up_to_date(PDF_path, spec_hash) else "built"
+
+    if status == "built" or show:
+        with instrumentation.span("Plotting figure", os.path.basename(spec_path)):
+            fig = plot_figure(spec, CSV_path)
+
+    if status == "built":
+        f.export_figure_as_pdf(PDF_path, rasterize_above=spec.get("rasterize_above"))
+        with open(get_hash_path(PDF_path), 'w', encoding='utf-8') as hash_file:
+            hash_file.write(spec_hash)
+    else:
+        instrumentation.event("build_figure", PDF_path + " is up to date")
+
+    if status == "built" or show:
+        import matplotlib.pyplot as plt
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
+
+    return {"status": status, "PDF_path": PDF_path}
+
+# EOF #
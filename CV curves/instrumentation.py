@@ -0,0 +1,230 @@
+##===============================================##
+##        File: instrumentation.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Timing and memory spans of the
+##              stages of a run (parsing, analysis,
+##              text rendering, PDF export, ...),
+##              printed silent, human-readable or
+##              as JSON lines, and summed up in a
+##              profile report.
+##              Output is set with set_output or the
+##              environment variables:
+##               TIF351_OUTPUT=silent|human|json
+##               TIF351_TRACE_MEMORY=1
+##               TIF351_PROFILE=<path to JSON report>
+##              Useful functions:
+##               - span, event
+##               - set_output
+##               - print_profile_report
+##               - dump_profile
+##===============================================##
+
+
+## LIBRARIES ##
+import os
+import sys
+import json
+import time
+import atexit
+import contextlib
+import collections
+# tracemalloc is imported when memory tracing is turned on, it slows down every allocation
+
+## CONSTANTS ##
+OUTPUT_MODES = ('silent', 'human', 'json')
+RUN_START_TIME = time.perf_counter()
+MAX_RECORDS = 10000 # finished spans and events kept for dump_profile, older ones are dropped so a run that follows a log for days does not grow
+
+settings = {
+    'output':       'human', # set from TIF351_OUTPUT at the end of the module
+    'trace_memory': os.environ.get("TIF351_TRACE_MEMORY", "0") == "1",
+}
+records = collections.deque(maxlen=MAX_RECORDS) # the last finished spans and events of this run, in the order they finished
+stages = {}     # sum of all finished spans of this run by name, updated when a span finishes, see get_profile
+open_spans = [] # spans that have started but not finished, innermost last
+
+
+## FUNCTIONS ##
+def set_output(mode=None, trace_memory=None):
+    """Sets how spans are printed and if their peak memory is traced
+
+    INPUT:
+        mode: 'silent' prints nothing, 'human' prints "DONE: name: message (time, memory)" lines,
+              'json' prints every span as a JSON line (default None, unchanged)
+
+        trace_memory: traces the peak memory of every span with tracemalloc, which makes allocations slower (default None, unchanged)
+    """
+    if mode is not None:
+        if mode not in OUTPUT_MODES:
+            raise ValueError("WARNING: output mode must be one of " + str(OUTPUT_MODES) + ", not " + str(mode))
+        settings['output'] = mode
+
+    if trace_memory is not None:
+        settings['trace_memory'] = trace_memory
+        if trace_memory:
+            start_memory_tracing()
+
+
+def start_memory_tracing():
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def get_traced_memory():
+    """Returns (current, peak) traced memory in bytes, or (None, None) if memory is not traced"""
+    if not settings['trace_memory']:
+        return None, None
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        return None, None
+    return tracemalloc.get_traced_memory()
+
+
+def emit(record):
+    if settings['output'] == 'human':
+        message = ": " + record['message'] if record['message'] else ""
+        details = ""
+        if record['kind'] == 'span':
+            details = f" ({record['wall_time']:.3f} s" + (f", peak {record['peak_memory']/1e6:.1f} MB" if record['peak_memory'] is not None else "") + ")"
+        print("DONE: " + record['name'] + message + details)
+    elif settings['output'] == 'json':
+        print(json.dumps(record, default=str))
+
+
+@contextlib.contextmanager
+def span(name, message="", print_message=True, **fields):
+    """Records the wall time (and peak memory, if traced) of the code in a with-block as a stage of the run
+
+    INPUT:
+        name: name of the stage, spans with the same name are summed up in the profile report, e.g. 'Reading CSV'
+
+        message: details of this span, e.g. the path of the file (default '')
+
+        print_message: prints the span when it finishes, in the output mode of set_output (default True)
+
+        fields: anything JSON-like to keep with the span, e.g. rows=1000
+
+    OUTPUT:
+        the record of the span (dict), whose 'message' and 'fields' can be changed in the with-block,
+        e.g. when the number of points is only known at the end
+    """
+    if settings['trace_memory']:
+        start_memory_tracing()
+
+    record = {
+        'kind':        'span',
+        'name':        name,
+        'message':     message,
+        'fields':      fields,
+        'parent':      open_spans[-1]['name'] if open_spans else None,
+        'depth':       len(open_spans),
+        'start':       time.perf_counter() - RUN_START_TIME,
+        'wall_time':   None,
+        'peak_memory': None,
+    }
+
+    # tracemalloc has one peak, which is reset for every span, so the peak of the parent so far is kept in it before that
+    current_memory, peak_memory = get_traced_memory()
+    if open_spans and peak_memory is not None:
+        open_spans[-1]['peak_absolute'] = max(open_spans[-1].get('peak_absolute', 0), peak_memory)
+    if current_memory is not None:
+        import tracemalloc
+        tracemalloc.reset_peak()
+    record['start_memory'] = current_memory
+
+    open_spans.append(record)
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_time'] = time.perf_counter() - start_time
+        open_spans.pop()
+
+        _, peak_memory = get_traced_memory()
+        start_memory = record.pop('start_memory')
+        peak_absolute = max(record.pop('peak_absolute', 0), peak_memory or 0)
+        if peak_memory is not None and start_memory is not None:
+            record['peak_memory'] = peak_absolute - start_memory # memory allocated above the start of the span at its peak
+            if open_spans:
+                open_spans[-1]['peak_absolute'] = max(open_spans[-1].get('peak_absolute', 0), peak_absolute)
+
+        records.append(record)
+        add_to_profile(record)
+        if print_message:
+            emit(record)
+
+
+def event(name, message="", print_message=True, **fields):
+    """Records something that happened without a duration worth timing, e.g. a plot setting. Printed without time and memory"""
+    record = {
+        'kind':        'event',
+        'name':        name,
+        'message':     message,
+        'fields':      fields,
+        'parent':      open_spans[-1]['name'] if open_spans else None,
+        'depth':       len(open_spans),
+        'start':       time.perf_counter() - RUN_START_TIME,
+        'wall_time':   0.0,
+        'peak_memory': None,
+    }
+    records.append(record)
+    if print_message:
+        emit(record)
+
+
+def add_to_profile(record):
+    """Adds a finished span to the sum of its stage"""
+    stage = stages.setdefault(record['name'], {'name': record['name'], 'count': 0, 'total_time': 0.0, 'max_time': 0.0, 'peak_memory': None})
+    stage['count'] += 1
+    stage['total_time'] += record['wall_time']
+    stage['max_time'] = max(stage['max_time'], record['wall_time'])
+    if record['peak_memory'] is not None:
+        stage['peak_memory'] = max(stage['peak_memory'] or 0, record['peak_memory'])
+
+
+def get_profile():
+    """Sums up all spans of the run by name, also the ones dropped from records. Returns a list of dicts with name, count,
+    total_time, max_time and peak_memory, the stages that took the longest first"""
+    return sorted((dict(stage) for stage in stages.values()), key=lambda stage: stage['total_time'], reverse=True)
+
+
+def print_profile_report(file=None):
+    """Prints a table of the time and peak memory of every stage of the run, the slowest first"""
+    file = file if file is not None else sys.stdout
+    print(f"\n{'stage':<44} {'count':>6} {'total / s':>10} {'max / s':>9} {'peak / MB':>10}", file=file)
+    for stage in get_profile():
+        peak = f"{stage['peak_memory']/1e6:.1f}" if stage['peak_memory'] is not None else "-"
+        print(f"{stage['name'][:44]:<44} {stage['count']:>6} {stage['total_time']:>10.3f} {stage['max_time']:>9.3f} {peak:>10}", file=file)
+    print(f"{'run':<44} {'':>6} {time.perf_counter() - RUN_START_TIME:>10.3f}", file=file)
+
+
+def dump_profile(path):
+    """Writes the profile of the run (the last MAX_RECORDS spans and events, and the sum of all spans by stage) to a JSON-file"""
+    report = {
+        'script':      sys.argv[0] if sys.argv else None,
+        'created':     time.strftime("%Y-%m-%d %H:%M:%S"),
+        'run_time':    time.perf_counter() - RUN_START_TIME,
+        'stages':      get_profile(),
+        'spans':       list(records),
+    }
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2, default=str)
+
+
+def reset():
+    """Forgets all finished spans, e.g. between runs in the same process"""
+    records.clear()
+    stages.clear()
+
+
+# checked the same way as set_output, so a misspelled mode is an error instead of printing nothing
+set_output(os.environ.get("TIF351_OUTPUT", "human"))
+
+
+if os.environ.get("TIF351_PROFILE"):
+    atexit.register(dump_profile, os.environ["TIF351_PROFILE"])
+
+# EOF #
@@ -0,0 +1,132 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Extract Excel to CSV.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Extract the sheets of the lab workbook to CSV-files, instead
+##              of copying them out of Excel by hand.
+##              1. Hash every sheet in the workbook (without parsing it) and
+##                 skip the sheets that are unchanged since the last run.
+##              2. Stream the rows of the changed sheets in read-only mode
+##                 to one CSV-file per sheet, in parallel processes.
+##              3. Combine the sheets into the CSV-files of the analysis
+##                 folders, in the same layout as the hand-extracted ones.
+##              Usage: python "Extract Excel to CSV.py" [--output-directory D] [--in-place] [--processes N] [--force]
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+CV_PATH = os.path.join(CURRENT_PATH, "CV curves")
+sys.path.insert(0, CV_PATH) # Excel_handler.py is only in the CV folder
+import Excel_handler
+import CSV_handler as CSV
+import instrumentation
+
+
+# CONSTANTS #
+WORKBOOK_PATH = os.path.join(CURRENT_PATH, "Raw data", "Fuel cell lab 121222 Data.xlsx")
+OUTPUT_DIRECTORY = os.path.join(CURRENT_PATH, "Raw data", "CSV")
+MANIFEST_FILENAME = ".extraction.json" # hash of every extracted sheet, to skip it while it is unchanged
+NUMBER_OF_COLUMNS = 2
+
+# CSV-files of the analysis folders: (folder, filename, [(sheet, columns of the sheet), ...], header), in the layout of the hand-extracted files
+LAB_CSVS = [
+    ("CV curves", "TIF351_Fuel-cell-laboration_CV-curve-data.csv",
+        [("CV fresh", [0, 1]), ("CV aged", [0, 1])],
+        ["Potential during CV 50 mV/s for fresh sample (V)", "Current during CV 50 mV/s for fresh sample (mA)",
+         "Potential during CV 50 mV/s for aged sample (V)",  "Current during CV 50 mV/s for aged sample (mA)"]),
+    ("Polarization curve", "TIF351_Fuel-cell-laboration_polarization-curve-data.csv",
+        [("Polarisation curve fresh", [1, 0]), ("Polarisation curve Aged", [1, 0])],
+        ["Current for polarization curve for fresh sample (mA)", "Potential for polarization curve for fresh sample (V)",
+         "Current for polarization curve for aged sample (mA)",  "Potential for polarization curve for aged sample (V)"]),
+]
+
+
+# FUNCTIONS #
+def get_sheet_CSV_path(output_directory, sheet_name):
+    return os.path.join(output_directory, sheet_name + ".csv")
+
+
+def load_manifest(output_directory):
+    try:
+        with open(os.path.join(output_directory, MANIFEST_FILENAME), 'r', encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_directory, manifest):
+    with open(os.path.join(output_directory, MANIFEST_FILENAME), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def extract_sheet(job):
+    """Extracts one sheet in a worker process, every worker opens the workbook itself. Returns (sheet name, rows, time)"""
+    Excel_file_path, sheet_name, CSV_file_path = job
+    start_time = time.perf_counter()
+    number_of_rows = Excel_handler.extract_sheet_to_CSV(Excel_file_path, sheet_name, CSV_file_path, number_of_columns=NUMBER_OF_COLUMNS, print_message=False)
+    return sheet_name, number_of_rows, time.perf_counter() - start_time
+
+
+def extract_workbook(Excel_file_path=WORKBOOK_PATH, output_directory=OUTPUT_DIRECTORY, processes=None, force=False):
+    """Extracts every sheet of a workbook that changed since the last extraction to its own CSV-file, in parallel.
+    Prints a line for every sheet and returns the names of the sheets that were extracted"""
+    os.makedirs(output_directory, exist_ok=True)
+    hashes = Excel_handler.hash_sheets(Excel_file_path)
+    manifest = load_manifest(output_directory)
+
+    changed_sheet_names = [sheet_name for sheet_name, sheet_hash in hashes.items()
+                           if force or manifest.get(sheet_name, {}).get("hash") != sheet_hash or not os.path.exists(get_sheet_CSV_path(output_directory, sheet_name))]
+    for sheet_name in hashes:
+        if sheet_name not in changed_sheet_names:
+            print(f"{'UNCHANGED':<10} {'':>8} {'':>8}  {sheet_name}")
+
+    if changed_sheet_names:
+        jobs = [(Excel_file_path, sheet_name, get_sheet_CSV_path(output_directory, sheet_name)) for sheet_name in changed_sheet_names]
+        with multiprocessing.Pool(processes=min(processes or os.cpu_count() or 1, len(jobs))) as pool:
+            for sheet_name, number_of_rows, wall_time in pool.imap_unordered(extract_sheet, jobs):
+                manifest[sheet_name] = {"hash": hashes[sheet_name], "rows": number_of_rows}
+                save_manifest(output_directory, manifest) # after every sheet, so an interrupted run keeps what it finished
+                print(f"{'EXTRACTED':<10} {number_of_rows:>8} {wall_time:>6.2f} s  {sheet_name}")
+
+    return changed_sheet_names
+
+
+def build_lab_CSVs(output_directory, changed_sheet_names, lab_directory=None, force=False):
+    """Combines the extracted sheets into the CSV-files of LAB_CSVS, if any of their sheets changed or the file is missing.
+    The files are written to lab_directory/<folder>, or to output_directory if lab_directory is None"""
+    for folder, filename, sheets, header in LAB_CSVS:
+        CSV_path = os.path.join(lab_directory, folder, filename) if lab_directory is not None else os.path.join(output_directory, filename)
+        if not force and os.path.exists(CSV_path) and not any(sheet_name in changed_sheet_names for sheet_name, _ in sheets):
+            print(f"{'UNCHANGED':<10} {'':>8} {'':>8}  {os.path.relpath(CSV_path, CURRENT_PATH)}")
+            continue
+
+        CSV.combine_CSV_files_to_one(CSV_path, [get_sheet_CSV_path(output_directory, sheet_name) for sheet_name, _ in sheets],
+                                     columns=[columns for _, columns in sheets], header=header)
+        print(f"{'COMBINED':<10} {'':>8} {'':>8}  {os.path.relpath(CSV_path, CURRENT_PATH)}")
+
+
+# MAIN #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the sheets of the lab workbook to CSV-files, skipping the sheets that are unchanged.")
+    parser.add_argument("--workbook", default=WORKBOOK_PATH, help="the .xlsx-file to extract (default: the lab workbook in Raw data)")
+    parser.add_argument("--output-directory", default=OUTPUT_DIRECTORY, help="folder of the CSV-file of every sheet (default: Raw data/CSV)")
+    parser.add_argument("--in-place", action="store_true", help="write the combined CSV-files to the analysis folders, replacing the hand-extracted ones")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--force", action="store_true", help="extract every sheet, also the unchanged ones")
+    arguments = parser.parse_args()
+
+    instrumentation.set_output("silent") # a line is printed for every sheet and file instead
+    changed_sheet_names = extract_workbook(arguments.workbook, arguments.output_directory, arguments.processes, arguments.force)
+    build_lab_CSVs(arguments.output_directory, changed_sheet_names, CURRENT_PATH if arguments.in_place else None, arguments.force)
+
+# EOF #
@@ -0,0 +1,62 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Polarization curve fitting.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Fit the activation (Tafel), ohmic and mass-transport loss
+##              model to every polarization curve of the figure specs.
+##              1. Read the curves the same way the plotting script does
+##                 (columns, sign and area from the .figure.json-files)
+##                 and drop the transient spikes (steady-state filter).
+##                 Average all samples at every potential setpoint.
+##              2. Fit all curves in vectorized batches over a pool of
+##                 processes (polarization_analysis.py).
+##              3. Print the parameters and export them as a CSV-table.
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import glob
+import CSV_handler as CSV
+import polarization_analysis
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+SPEC_paths = sorted(glob.glob(os.path.join(CURRENT_PATH, '*.figure.json'))) # add more specs (cells) to fit them all in one batch
+filename_CSV_fit = 'TIF351_Fuel-cell-laboration_polarization-curve-fit.csv'
+
+min_current_density = 1.0 # mA cm^-2, lower current densities are left out of the fit
+
+outlier_window = 11     # samples in the rolling median of the steady-state filter
+outlier_threshold = 5.0 # robust standard deviations from the rolling median before a sample is dropped as a transient
+bin_setpoints = True    # fit the mean current density at every potential setpoint instead of every raw sample
+
+
+# MAIN #
+if __name__ == '__main__':
+    labels, current_densities, potentials = polarization_analysis.load_curves(SPEC_paths)
+    current_densities, potentials, _ = polarization_analysis.filter_curves(current_densities, potentials, labels, window=outlier_window, threshold=outlier_threshold)
+    if bin_setpoints:
+        current_densities, potentials, _ = polarization_analysis.bin_curves(current_densities, potentials, labels)
+    parameters = polarization_analysis.fit_polarization_curves(current_densities, potentials, min_current_density=min_current_density)
+
+    print(f"\n{'Curve':<16} {'i0 / mA cm^-2':>14} {'b / mV dec^-1':>14} {'ASR / Ohm cm^2':>15} {'i_lim / mA cm^-2':>17} {'RMSE / mV':>10}")
+    for k, label in enumerate(labels):
+        print(f"{label:<16} {parameters['exchange_current_density'][k]:>14.3e} {parameters['Tafel_slope'][k]:>14.1f} {parameters['ASR'][k]:>15.3f} {parameters['limiting_current_density'][k]:>17.0f} {parameters['RMSE'][k]:>10.2f}")
+
+    CSV.print_arrays_to_CSV(os.path.join(CURRENT_PATH, filename_CSV_fit),
+                            'Curve', labels,
+                            'Exchange current density (mA cm^-2)', parameters['exchange_current_density'],
+                            'Tafel slope (mV dec^-1)', parameters['Tafel_slope'],
+                            'Area specific resistance (Ohm cm^2)', parameters['ASR'],
+                            'Limiting current density (mA cm^-2)', parameters['limiting_current_density'],
+                            'Mass transport coefficient (V)', parameters['mass_transport_coefficient'],
+                            'RMSE (mV)', parameters['RMSE'],
+                            'Number of points', parameters['number_of_points'],
+                            'Converged', parameters['converged'],
+                            print_message=True)
+
+# EOF #
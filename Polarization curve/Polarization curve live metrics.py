@@ -0,0 +1,101 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Polarization curve live metrics.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Follow a polarization curve log that the potentiostat is
+##              still appending to, e.g. during a durability test.
+##              1. Parse only the rows appended since the last check
+##                 (CSV_handler.follow).
+##              2. Update the maximum power point and the current density
+##                 at fixed potentials with the new samples only
+##                 (polarization_analysis.update_performance_metrics).
+##              3. Append the power density of the new samples and refresh
+##                 the one-row summary, without reprocessing the history.
+##              The steady-state filter needs samples on both sides of a
+##              sample, so the live metrics are of the unfiltered samples.
+##              Usage: python "Polarization curve live metrics.py" [CSV-file] [--timeout S] [...]
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import argparse
+import numpy as np
+import CSV_handler as CSV
+import series_handler
+import polarization_analysis
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+filename_CSV_log = 'TIF351_Fuel-cell-laboration_polarization-curve-data.csv'
+filename_CSV_curve = 'TIF351_Fuel-cell-laboration_polarization-curve-live-power.csv'
+filename_CSV_summary = 'TIF351_Fuel-cell-laboration_polarization-curve-live-metrics.csv'
+
+area = 5 # cm^2
+sign = -1 # the potentiostat logs the current of a fuel cell delivering current as negative
+fixed_potentials = (0.6, 0.7, 0.8) # V
+
+
+# FUNCTIONS #
+def follow_polarization_log(CSV_path, curve_path, summary_path, current_column=0, potential_column=1, interval=1.0, timeout=None):
+    """Follows a polarization curve log and prints the running metrics every time new rows are appended.
+    The new samples are appended to curve_path and the summary in summary_path is rewritten, both are started over if the log is restarted.
+    Returns the state of polarization_analysis.update_performance_metrics when the log has not grown for timeout seconds"""
+    state = None
+
+    for rows, restarted in CSV.follow(CSV_path, interval=interval, timeout=timeout):
+        if restarted: # a new log, the metrics so far are of another curve
+            state = None
+
+        current_density = series_handler.divide_by_area(series_handler.from_column(rows, current_column, unit='mA'), area)
+        current_density = series_handler.scale(current_density, sign)
+        potential = series_handler.from_column(rows, potential_column, unit='V')
+        is_measured = ~np.isnan(current_density['values']) & ~np.isnan(potential['values'])
+        current_density, potential = current_density['values'][is_measured], potential['values'][is_measured]
+
+        first_update = state is None
+        state, new_samples = polarization_analysis.update_performance_metrics(state, current_density, potential, fixed_potentials=fixed_potentials)
+
+        CSV.print_arrays_to_CSV(curve_path,
+                                'Current density (mA cm^-2)', current_density,
+                                'Potential (V)',              potential,
+                                'Power density (mW cm^-2)',   new_samples['power_density'],
+                                'Voltage efficiency (1)',     new_samples['voltage_efficiency'],
+                                append=not first_update)
+
+        columns = ['Number of samples',                       [state['length']],
+                   'Max power density (mW cm^-2)',            [state['max_power_density']],
+                   'Current density at max power (mA cm^-2)', [state['current_density_at_max_power']],
+                   'Potential at max power (V)',              [state['potential_at_max_power']],
+                   'Voltage efficiency at max power (1)',     [state['voltage_efficiency_at_max_power']]]
+        for j, fixed_potential in enumerate(state['fixed_potentials']):
+            columns += [f'Current density at {fixed_potential} V (mA cm^-2)', [state['current_density_at_fixed_potentials'][j]]]
+        CSV.print_arrays_to_CSV(summary_path, *columns)
+
+        print(f"{state['length']} samples, P_max {state['max_power_density']:.1f} mW cm^-2 at {state['potential_at_max_power']:.3f} V"
+              + "".join(f", i({E} V) {current_density:.1f}" for E, current_density in zip(fixed_potentials, state['current_density_at_fixed_potentials'])))
+
+    return state
+
+
+# MAIN #
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Follow a growing polarization curve log and update its performance metrics with the new rows only.")
+    parser.add_argument("CSV", nargs="?", default=os.path.join(CURRENT_PATH, filename_CSV_log), help="polarization curve log to follow (default: the polarization data of the lab)")
+    parser.add_argument("--curve-output", default=os.path.join(CURRENT_PATH, filename_CSV_curve), help="CSV-file the power density of the new samples is appended to")
+    parser.add_argument("--summary-output", default=os.path.join(CURRENT_PATH, filename_CSV_summary), help="CSV-file with the running metrics, rewritten on every update")
+    parser.add_argument("--current-column", type=int, default=0, help="column of the current in mA (default 0)")
+    parser.add_argument("--potential-column", type=int, default=1, help="column of the potential in V (default 1)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between checks of the log (default 1)")
+    parser.add_argument("--timeout", type=float, default=None, help="stop after this many seconds without new rows (default: follow until Ctrl+C)")
+    arguments = parser.parse_args()
+
+    try:
+        follow_polarization_log(arguments.CSV, arguments.curve_output, arguments.summary_output, arguments.current_column, arguments.potential_column, arguments.interval, arguments.timeout)
+    except KeyboardInterrupt:
+        pass
+
+# EOF #
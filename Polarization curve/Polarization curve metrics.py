@@ -0,0 +1,70 @@
+##======================================================================##
+##     Project: [TIF351] FUEL CELL LAB - DATA ANALYSIS
+##        File: Polarization curve metrics.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Performance metrics of every polarization curve of the
+##              figure specs, computed for all curves in one pass.
+##              1. Read the curves the same way the plotting script does
+##                 and drop the transient spikes (steady-state filter).
+##              2. Power density and voltage efficiency of every sample,
+##                 maximum power point and current density at fixed
+##                 potentials of every curve (polarization_analysis.py).
+##              3. Export the derived curves and the summary as CSV-files.
+##======================================================================##
+
+
+# LIBRARIES #
+import os
+import glob
+import CSV_handler as CSV
+import polarization_analysis
+
+
+# CONSTANTS #
+CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
+SPEC_paths = sorted(glob.glob(os.path.join(CURRENT_PATH, '*.figure.json'))) # add more specs (cells) to compute them all in one pass
+filename_CSV_curves = 'TIF351_Fuel-cell-laboration_polarization-curve-power.csv'
+filename_CSV_summary = 'TIF351_Fuel-cell-laboration_polarization-curve-metrics.csv'
+
+fixed_potentials = (0.6, 0.7, 0.8) # V
+
+outlier_window = 11     # samples in the rolling median of the steady-state filter
+outlier_threshold = 5.0 # robust standard deviations from the rolling median before a sample is dropped as a transient
+
+
+# MAIN #
+if __name__ == '__main__':
+    labels, current_densities, potentials = polarization_analysis.load_curves(SPEC_paths)
+    current_densities, potentials, _ = polarization_analysis.filter_curves(current_densities, potentials, labels, window=outlier_window, threshold=outlier_threshold)
+    metrics = polarization_analysis.compute_performance_metrics(current_densities, potentials, fixed_potentials=fixed_potentials)
+
+    print(f"\n{'Curve':<16} {'P_max / mW cm^-2':>17} {'at i / mA cm^-2':>16} {'at E / V':>9} {'efficiency':>11}" + "".join(f" {f'i({E} V)':>10}" for E in fixed_potentials))
+    for k, label in enumerate(labels):
+        print(f"{label:<16} {metrics['max_power_density'][k]:>17.1f} {metrics['current_density_at_max_power'][k]:>16.1f} {metrics['potential_at_max_power'][k]:>9.3f} {metrics['voltage_efficiency_at_max_power'][k]:>11.3f}"
+              + "".join(f" {current_density:>10.1f}" for current_density in metrics['current_density_at_fixed_potentials'][k]))
+
+
+    # Derived curves: the rows of the metric arrays, without their NaN padding, are printed as columns
+    columns = []
+    for k, label in enumerate(labels):
+        length = metrics['length'][k]
+        columns += [f'Current density for {label} (mA cm^-2)', metrics['current_density'][k, :length],
+                    f'Potential for {label} (V)',               metrics['potential'][k, :length],
+                    f'Power density for {label} (mW cm^-2)',    metrics['power_density'][k, :length],
+                    f'Voltage efficiency for {label} (1)',      metrics['voltage_efficiency'][k, :length]]
+    CSV.print_arrays_to_CSV(os.path.join(CURRENT_PATH, filename_CSV_curves), *columns, print_message=True)
+
+
+    # Summary: one row per curve
+    columns = ['Curve', labels,
+               'Max power density (mW cm^-2)',                metrics['max_power_density'],
+               'Current density at max power (mA cm^-2)',     metrics['current_density_at_max_power'],
+               'Potential at max power (V)',                  metrics['potential_at_max_power'],
+               'Voltage efficiency at max power (1)',         metrics['voltage_efficiency_at_max_power']]
+    for j, fixed_potential in enumerate(metrics['fixed_potentials']):
+        columns += [f'Current density at {fixed_potential} V (mA cm^-2)', metrics['current_density_at_fixed_potentials'][:, j]]
+    CSV.print_arrays_to_CSV(os.path.join(CURRENT_PATH, filename_CSV_summary), *columns, print_message=True)
+
+# EOF #
@@ -3,52 +3,124 @@
 ##        File: functions.py
 ##      Author: GOTTFRID OLSSON 
 ##     Created: 2022-06-21, 17:50
-##     Updated: 2022-08-02, 15:40
+##     Updated: 2026-10-18
 ##       About: Helper functions for plotting.
+##              matplotlib and numpy are imported in the
+##              functions that use them, so importing this
+##              module (e.g. for cm_2_inch) stays fast.
+##              What the helpers did is recorded with
+##              instrumentation.py (timing, memory).
 ##=============================================##
 
-import matplotlib
+import os
+import instrumentation
 
 
 def cm_2_inch(cm):
     return cm/2.54
 
 
-def set_LaTeX_and_CMU(LaTeX_and_CMU_on=True):
-    if LaTeX_and_CMU_on:
+def downsample_min_max(x_data, y_data, target_points=4000):
+    """Reduces a series to about target_points points for plotting, keeping its visual shape. Linear in the number of points.
+
+    The points are split into buckets of consecutive samples, and the points with the smallest and largest x and y
+    of every bucket are kept, in their original order. Points with NaN are dropped.
+    Returns x_data and y_data as NumPy arrays, all of them if target_points is None or there are not more points than that,
+    which are then the float arrays that were passed in, not copies, if no point is dropped.
+    """
+    import numpy as np
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    is_finite = np.isfinite(x_data) & np.isfinite(y_data)
+    if not is_finite.all(): # a mask copies, so only when there is something to drop
+        x_data, y_data = x_data[is_finite], y_data[is_finite]
+
+    number_of_points = len(x_data)
+    if target_points is None or number_of_points <= target_points:
+        return x_data, y_data
+
+    bucket_size = -(-number_of_points // max(1, target_points // 4))
+    number_of_buckets = -(-number_of_points // bucket_size)
+    bucket_starts = np.arange(number_of_buckets)[:, np.newaxis] * bucket_size
+
+    extremes = []
+    for data in (x_data, y_data):
+        buckets = np.full(number_of_buckets * bucket_size, np.nan)
+        buckets[:number_of_points] = data
+        buckets = buckets.reshape(number_of_buckets, bucket_size)
+        extremes.append(np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1))
+        extremes.append(np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1))
+
+    indices = np.sort(np.stack(extremes, axis=1) + bucket_starts, axis=1).ravel()
+    indices = indices[np.concatenate(([True], indices[1:] != indices[:-1]))]
+    instrumentation.event("downsample_min_max", str(number_of_points) + " to " + str(len(indices)) + " points")
+    return x_data[indices], y_data[indices]
+
+
+def set_LaTeX_and_CMU(LaTeX_and_CMU_on=True, mode='latex'):
+    """mode: 'latex' renders text with LaTeX (text.usetex). matplotlib keeps the rendered text in matplotlib.get_cachedir()/tex.cache,
+             keyed on a hash of the text and preamble, so it is reused by every later run and process (MPLCONFIGDIR moves it),
+             'mathtext' renders with matplotlib's mathtext and the Computer Modern fonts it ships, without any LaTeX processes"""
+    import matplotlib
+    if LaTeX_and_CMU_on and mode == 'latex':
         matplotlib.rcParams.update({
     "text.usetex": True,
     "font.family": "serif", 
     "font.serif" : ["Computer Modern Roman"]
     })
-    print("DONE: set_LaTeX_and_CMU: " + str(LaTeX_and_CMU_on))
+    elif LaTeX_and_CMU_on and mode == 'mathtext':
+        matplotlib.rcParams.update({
+    "text.usetex": False,
+    "mathtext.fontset": "cm",
+    "font.family": "serif",
+    "font.serif" : ["cmr10"],
+    "axes.formatter.use_mathtext": True # cmr10 has no minus sign, mathtext draws it instead
+    })
+    elif LaTeX_and_CMU_on:
+        raise ValueError("WARNING: mode must be 'latex' or 'mathtext', not " + str(mode))
+    instrumentation.event("set_LaTeX_and_CMU", str(LaTeX_and_CMU_on) + ", mode: " + str(mode))
+
+
+def time_text_rendering(fig):
+    """Draws the figure and records and returns the time it took together with the text mode. With text.usetex the LaTeX
+    processes dominate the time, so comparing the modes of set_LaTeX_and_CMU (and a first and second 'latex' run, the second
+    from the cache) with this shows what the text rendering costs. The text rendering cases of 'Benchmark suite.py' do this"""
+    import matplotlib.text
+    mode = 'latex' if matplotlib.rcParams["text.usetex"] else 'mathtext'
+    number_of_texts = len([text for text in fig.findobj(matplotlib.text.Text) if text.get_visible() and text.get_text()])
+
+    with instrumentation.span("time_text_rendering", str(number_of_texts) + " texts drawn with " + mode, texts=number_of_texts, mode=mode) as record:
+        fig.canvas.draw()
+    return record['wall_time']
 
 
 def set_font_size(axis=13, tick=11, legend=9): #2023-05-27, set standard values
+    import matplotlib
     matplotlib.rc('font',   size=axis)      #2022-06-21: not sure what the difference is, to test later on!
     matplotlib.rc('axes',   titlesize=axis) #2022-06-21: not sure what the difference is, to test later on!
     matplotlib.rc('axes',   labelsize=axis) #2022-06-21: not sure what the difference is, to test later on!
     matplotlib.rc('xtick',  labelsize=tick)
     matplotlib.rc('ytick',  labelsize=tick)
     matplotlib.rc('legend', fontsize=legend)
-    print("DONE: set_font_size: (axis, tick, legend): " + str(axis) + ", " + str(tick) + ", " + str(legend))
+    instrumentation.event("set_font_size", "(axis, tick, legend): " + str(axis) + ", " + str(tick) + ", " + str(legend))
 
 
 def set_title(title):
+    import matplotlib.pyplot
     matplotlib.pyplot.title(title)
-    print("DONE: set_title to: " + str(title))
+    instrumentation.event("set_title", "to: " + str(title))
 
 def set_axis_labels(ax, x_label, y_label, axNum=None):
     ax.set_xlabel(str(x_label))
     ax.set_ylabel(str(y_label))
-    print("DONE: set_axis_labels: on axs: " + str(axNum))
+    instrumentation.event("set_axis_labels", "on axs: " + str(axNum))
 
 
 def set_legend(ax, legend_on, alpha, location, axNum=None):
             
     if legend_on:
         ax.legend(framealpha=alpha, loc=location)
-    print("DONE: set_legend: (on, alpha, location): " + str(legend_on) + ", " + str(alpha) + ", " + str(location) + ", on axs: " + str(axNum))
+    instrumentation.event("set_legend", "(on, alpha, location): " + str(legend_on) + ", " + str(alpha) + ", " + str(location) + ", on axs: " + str(axNum))
 
 
 def set_grid(ax, grid_major_on, grid_major_linewidth, grid_minor_on, grid_minor_linewidth, axNum=None):
@@ -58,13 +130,13 @@ def set_grid(ax, grid_major_on, grid_major_linewidth, grid_minor_on, grid_minor_
         ax.minorticks_on()
         ax.grid(grid_minor_on, which='minor', linewidth=grid_minor_linewidth)
     ###ax.grid(True, which='both', linewidth=grid_minor_linewidth) # TEMP 2023-02-23, did NOT put logarithmic grids on my linear-log plot (x-y)
-    print("DONE: set_grid: grid_major: " + str(grid_major_on) +", grid_minor: "+ str(grid_minor_on)+  " on axs: " + str(axNum))
+    instrumentation.event("set_grid", "grid_major: " + str(grid_major_on) +", grid_minor: "+ str(grid_minor_on)+  " on axs: " + str(axNum))
 
 
 def set_axis_scale(ax, xScale_string, yScale_string, axNum=None):
     ax.set_xscale(xScale_string)
     ax.set_yscale(yScale_string)
-    print("DONE: set_axis_scale: X: " + str(xScale_string) + ", Y: " + str(yScale_string) + " on axs: " + str(axNum))
+    instrumentation.event("set_axis_scale", "X: " + str(xScale_string) + ", Y: " + str(yScale_string) + " on axs: " + str(axNum))
 
 
 def set_axis_limits(ax, xmin, xmax, ymin, ymax, axNum=None):
@@ -75,47 +147,75 @@ def set_axis_limits(ax, xmin, xmax, ymin, ymax, axNum=None):
     
     ax.set_xlim(xmin, xmax)
     ax.set_ylim(ymin, ymax)
-    print("DONE: set_axis_limits: x=(" + str(xmin) + ", " + str(xmax)+ ") and y=(" + str(ymin) + ", " + str(ymax)+ ") on axs: " + str(axNum))
+    instrumentation.event("set_axis_limits", "x=(" + str(xmin) + ", " + str(xmax)+ ") and y=(" + str(ymin) + ", " + str(ymax)+ ") on axs: " + str(axNum))
 
 
 def set_axis_invert(ax, x_invert, y_invert, axNum=None):
     if x_invert: ax.invert_xaxis()
     if y_invert: ax.invert_yaxis()
-    print("DONE: set_axis_invert: x: " + str(x_invert) + ", y: " + str(y_invert) + " on axs: " + str(axNum))
+    instrumentation.event("set_axis_invert", "x: " + str(x_invert) + ", y: " + str(y_invert) + " on axs: " + str(axNum))
 
 
 def set_commaDecimal_with_precision_x_axis(ax, xAxis_precision, axNum=None):
+    import matplotlib.ticker
     xFormatString = '{:.' + str(xAxis_precision) + 'f}'
     ax.get_xaxis().set_major_formatter( matplotlib.ticker.FuncFormatter(lambda x, pos: xFormatString.format(x).replace('.', ',')) )    
-    print("DONE: set_commaDecimal_with_precision_x_axis: "+str(xAxis_precision) + " on axs: "+str(axNum))
+    instrumentation.event("set_commaDecimal_with_precision_x_axis", str(xAxis_precision) + " on axs: "+str(axNum))
 
 def set_commaDecimal_with_precision_y_axis(ax, yAxis_precision, axNum=None):
+    import matplotlib.ticker
     yFormatString = '{:.' + str(yAxis_precision) + 'f}'
     ax.get_yaxis().set_major_formatter( matplotlib.ticker.FuncFormatter(lambda x, pos: yFormatString.format(x).replace('.', ',')) )    
-    print("DONE: set_commaDecimal_with_precision_y_axis: "+str(yAxis_precision) + " on axs: "+str(axNum))
+    instrumentation.event("set_commaDecimal_with_precision_y_axis", str(yAxis_precision) + " on axs: "+str(axNum))
 
 
 def set_pointDecimal_with_precision_x_axis(ax, xAxis_precision, axNum=None):
+    import matplotlib.ticker
     xFormatString = '{:.' + str(xAxis_precision) + 'f}'
     ax.get_xaxis().set_major_formatter( matplotlib.ticker.FuncFormatter(lambda x, pos: xFormatString.format(x)) )    
-    print("DONE: set_pointDecimal_with_precision_x_axis: "+str(xAxis_precision) + " on axs: "+str(axNum))
+    instrumentation.event("set_pointDecimal_with_precision_x_axis", str(xAxis_precision) + " on axs: "+str(axNum))
 
 def set_pointDecimal_with_precision_y_axis(ax, yAxis_precision, axNum=None):
+    import matplotlib.ticker
     yFormatString = '{:.' + str(yAxis_precision) + 'f}'
     ax.get_yaxis().set_major_formatter( matplotlib.ticker.FuncFormatter(lambda x, pos: yFormatString.format(x)) )    
-    print("DONE: set_pointDecimal_with_precision_y_axis: "+str(yAxis_precision) + " on axs: "+str(axNum))
+    instrumentation.event("set_pointDecimal_with_precision_y_axis", str(yAxis_precision) + " on axs: "+str(axNum))
 
 
 def set_layout_tight(fig):
     fig.tight_layout()
-    print("DONE: set_layout_tight")
+    instrumentation.event("set_layout_tight")
 
 
 def align_labels(fig):
     fig.align_labels()
-    print("DONE: align_labels")
+    instrumentation.event("align_labels")
     
 
-def export_figure_as_pdf(filePath):
-    matplotlib.pyplot.savefig(filePath, format='pdf', bbox_inches='tight')#, metadata={"Author" : "Gottfrid Olsson", "Title" : "", "Keywords" : "Created with PlotData by Gottfrid Olsson"}) ##this could be implemented in the future, 2022-06-21
-    print("DONE: export_figure_as_pdf: " + filePath)
+def export_figure_as_pdf(filePath, rasterize_above=None, dpi=300):
+    """Exports the current figure as a PDF and returns (export time in seconds, file size in bytes)
+
+    rasterize_above: lines and scatter collections with more points than this are drawn as an image at dpi,
+                     while axes, labels and text stay vector (default None, everything is vector)
+    """
+    import matplotlib.pyplot
+    figure = matplotlib.pyplot.gcf()
+    number_of_rasterized = 0
+    if rasterize_above is not None:
+        for ax in figure.get_axes():
+            for line in ax.get_lines():
+                if len(line.get_xdata()) > rasterize_above:
+                    line.set_rasterized(True)
+                    number_of_rasterized += 1
+            for collection in ax.collections:
+                if len(collection.get_offsets()) > rasterize_above:
+                    collection.set_rasterized(True)
+                    number_of_rasterized += 1
+
+    with instrumentation.span("export_figure_as_pdf", filePath, rasterized_artists=number_of_rasterized) as record:
+        figure.savefig(filePath, format='pdf', bbox_inches='tight', dpi=dpi)#, metadata={"Author" : "Gottfrid Olsson", "Title" : "", "Keywords" : "Created with PlotData by Gottfrid Olsson"}) ##this could be implemented in the future, 2022-06-21
+        file_size = os.path.getsize(filePath)
+        record['message'] += f" ({file_size/1000:.1f} kB, {number_of_rasterized} rasterized artists)"
+        record['fields']['file_size'] = file_size
+
+    return record['wall_time'], file_size
@@ -0,0 +1,547 @@
+##===============================================##
+##        File: polarization_analysis.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Vectorized analysis of fuel cell
+##              polarization curves.
+##              Useful functions:
+##               - load_curves
+##               - filter_curves
+##               - bin_setpoints
+##               - pack_curves
+##               - fit_curve_batch
+##               - fit_polarization_curves
+##               - compute_performance_metrics
+##               - update_performance_metrics
+##===============================================##
+
+
+## LIBRARIES ##
+import numpy as np
+import instrumentation
+
+
+## CONSTANTS ##
+REVERSIBLE_POTENTIAL = 1.229 # V vs RHE, O2/H2O at 25 degC
+FIXED_POTENTIALS = (0.6, 0.7, 0.8) # V, potentials at which the current density is reported
+FILTER_BLOCK_SIZE = 2**18 # samples per block of the rolling median, bounds the memory of the (block, window) views
+
+
+## FUNCTIONS ##
+def load_curves(SPEC_paths):
+    """Returns the labels, current densities (mA cm^-2) and potentials (V) of every series in the figure specs,
+    read the same way as they are plotted (columns, sign and area from the spec). Shorter columns are padded with NaN"""
+    import figure_spec # only needed when the curves are read from specs
+
+    labels, current_densities, potentials = [], [], []
+    for spec_path in SPEC_paths:
+        spec_labels, spec_current_densities, spec_potentials = figure_spec.load_series(spec_path)
+        labels += spec_labels
+        current_densities += spec_current_densities
+        potentials += spec_potentials
+    return labels, current_densities, potentials
+
+
+def get_rolling_median_and_MAD(values, window=11, block_size=FILTER_BLOCK_SIZE):
+    """Rolling median and median absolute deviation (MAD) of a centred window, for every sample
+
+    The ends are padded by reflection, so the first and last samples get a full window too.
+    The windows are processed in blocks, so time and memory grow linearly with the number of samples (for a fixed window).
+
+    INPUT:
+        values: (n,) array
+
+        window: number of samples in the window, made odd by adding one if even (default 11)
+
+    OUTPUT:
+        median, MAD: (n,) arrays
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    values = np.asarray(values, dtype=float)
+    number_of_samples = len(values)
+    half_window = window // 2
+    median, MAD = np.empty(number_of_samples), np.empty(number_of_samples)
+    if number_of_samples == 0:
+        return median, MAD
+
+    padded = np.pad(values, half_window, mode='reflect' if number_of_samples > 1 else 'edge')
+    for block_start in range(0, number_of_samples, block_size):
+        block_stop = min(block_start + block_size, number_of_samples)
+        windows = sliding_window_view(padded[block_start:block_stop + 2*half_window], 2*half_window + 1)
+        # the window is odd, so the median is the middle element, found by partitioning instead of sorting
+        median[block_start:block_stop] = np.partition(windows, half_window, axis=1)[:, half_window]
+        MAD[block_start:block_stop] = np.partition(np.abs(windows - median[block_start:block_stop, None]), half_window, axis=1)[:, half_window]
+    return median, MAD
+
+
+def get_outlier_mask(values, window=11, threshold=5.0, noise_floor=None):
+    """Hampel filter: a sample is an outlier if it is further than threshold robust standard deviations from the rolling median
+
+    INPUT:
+        values: (n,) array, e.g. the current of a polarization curve
+
+        window: odd number of samples in the rolling window (default 11)
+
+        threshold: number of robust standard deviations (1.4826 MAD) a sample may deviate (default 5.0)
+
+        noise_floor: smallest standard deviation used, so flat stretches with MAD = 0 do not reject every small step
+                     (default None, the noise of the whole signal estimated from the MAD of its first differences)
+
+    OUTPUT:
+        (n,) bool array, True for outliers. NaN samples are never outliers
+    """
+    values = np.asarray(values, dtype=float)
+    median, MAD = get_rolling_median_and_MAD(values, window)
+
+    if noise_floor is None:
+        steps = np.abs(np.diff(values))
+        steps = steps[~np.isnan(steps)]
+        noise_floor = 1.4826 * np.median(steps) / np.sqrt(2) if len(steps) else 0.0
+
+    with np.errstate(invalid='ignore'):
+        return np.abs(values - median) > threshold * np.maximum(1.4826 * MAD, noise_floor)
+
+
+def filter_curves(current_densities, potentials, labels=None, window=11, threshold=5.0, print_message=True):
+    """Steady-state filter stage for curves read with CSV_handler.read: drops the NaN padding and the transient spikes
+    (outliers of the current density, see get_outlier_mask) of every curve
+
+    INPUT:
+        current_densities, potentials: lists of (n_k,) arrays, e.g. from load_curves
+
+        labels: names of the curves in the message (default None, numbered)
+
+        window, threshold: see get_outlier_mask
+
+        print_message: displays a message "DONE: Filtering curves: (...)" with the number of dropped points of every curve (default True)
+
+    OUTPUT:
+        filtered current_densities, filtered potentials, number of dropped points of every curve (list of ints)
+    """
+    filtered_current_densities, filtered_potentials, number_dropped = [], [], []
+
+    for current_density, potential in zip(current_densities, potentials):
+        current_density = np.asarray(current_density, dtype=float)
+        potential = np.asarray(potential, dtype=float)
+        is_measured = ~np.isnan(current_density) & ~np.isnan(potential)
+        current_density, potential = current_density[is_measured], potential[is_measured]
+
+        is_kept = ~get_outlier_mask(current_density, window, threshold)
+        filtered_current_densities.append(current_density[is_kept])
+        filtered_potentials.append(potential[is_kept])
+        number_dropped.append(int(len(is_kept) - np.count_nonzero(is_kept)))
+
+    if print_message:
+        labels = labels if labels is not None else [f"curve {k}" for k in range(len(number_dropped))]
+        instrumentation.event("Filtering curves", ", ".join(f"{label}: dropped {dropped} of {len(current_density) + dropped} points"
+                                                            for label, dropped, current_density in zip(labels, number_dropped, filtered_current_densities)))
+    return filtered_current_densities, filtered_potentials, number_dropped
+
+
+def get_setpoint_resolution(setpoint_values):
+    """Smallest step of a stepped signal, estimated as the median of its nonzero steps (e.g. 0.001 V for 1 mV steps)"""
+    steps = np.abs(np.diff(np.asarray(setpoint_values, dtype=float)))
+    steps = steps[steps > 0]
+    return float(np.median(steps)) if len(steps) else 1.0
+
+
+def bin_setpoints(setpoint_values, values, resolution=None, consecutive=False):
+    """Detects the setpoints of a stepped signal and collapses the samples of every setpoint into mean, standard deviation and count,
+    in one sort and np.add.reduceat pass
+
+    INPUT:
+        setpoint_values: (n,) array of the stepped signal, e.g. the potential of a potentiostatic polarization curve
+
+        values: (n,) array or list of (n,) arrays measured at the setpoints, e.g. the current density
+
+        resolution: setpoints closer than this are the same, samples are grouped by round(setpoint / resolution)
+                    (default None, the smallest step of setpoint_values, see get_setpoint_resolution)
+
+        consecutive: True groups every dwell (run of consecutive samples at the same setpoint) on its own, so the sweeps of a
+                     curve are kept apart. False groups all samples at a setpoint, from all sweeps (default False)
+
+    OUTPUT:
+        dict with (number of groups,) arrays, ordered by setpoint (consecutive=False) or by time (consecutive=True):
+            'setpoint': mean of setpoint_values, 'count': number of samples,
+            'mean' and 'std': arrays (or lists of arrays, like values) of the mean and population standard deviation of values
+        Samples with a NaN or infinite setpoint are dropped.
+    """
+    setpoint_values = np.asarray(setpoint_values, dtype=float)
+    is_list = isinstance(values, (list, tuple))
+    values = np.column_stack([np.asarray(value, dtype=float) for value in (values if is_list else [values])])
+
+    # a NaN setpoint has no key (it would be cast to an arbitrary integer), e.g. the empty cells of a shorter column
+    is_finite = np.isfinite(setpoint_values)
+    setpoint_values, values = setpoint_values[is_finite], values[is_finite]
+    if resolution is None:
+        resolution = get_setpoint_resolution(setpoint_values)
+
+    keys = np.round(setpoint_values / resolution).astype(np.int64)
+    if not consecutive:
+        order = np.argsort(keys, kind='stable')
+        keys, setpoint_values, values = keys[order], setpoint_values[order], values[order]
+
+    group_starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1))
+    count = np.diff(np.append(group_starts, len(keys)))
+
+    if len(keys) == 0:
+        setpoint, mean, std = np.zeros(0), np.zeros((0, values.shape[1])), np.zeros((0, values.shape[1]))
+    else:
+        # two passes (mean, then squared deviations from it) instead of sums of squares, which lose precision for large offsets
+        setpoint = np.add.reduceat(setpoint_values, group_starts) / count
+        mean = np.add.reduceat(values, group_starts, axis=0) / count[:, None]
+        deviations = values - np.repeat(mean, count, axis=0)
+        std = np.sqrt(np.add.reduceat(deviations**2, group_starts, axis=0) / count[:, None])
+
+    return {
+        'setpoint': setpoint,
+        'count':    count,
+        'mean':     list(mean.T) if is_list else mean[:, 0],
+        'std':      list(std.T) if is_list else std[:, 0],
+    }
+
+
+def bin_curves(current_densities, potentials, labels=None, resolution=None, consecutive=False, print_message=True):
+    """Bins every curve at its potential setpoints with bin_setpoints, to fit or plot far fewer points
+
+    OUTPUT:
+        binned current_densities (means), binned potentials (setpoints), list of bin_setpoints dicts of every curve
+    """
+    binned = [bin_setpoints(potential, current_density, resolution, consecutive) for current_density, potential in zip(current_densities, potentials)]
+
+    if print_message:
+        labels = labels if labels is not None else [f"curve {k}" for k in range(len(binned))]
+        instrumentation.event("Binning curves", ", ".join(f"{label}: {len(potential)} -> {len(curve['setpoint'])} points"
+                                                          for label, potential, curve in zip(labels, potentials, binned)))
+    return [curve['mean'] for curve in binned], [curve['setpoint'] for curve in binned], binned
+
+
+def pack_curves(current_densities, potentials, min_current_density=1.0):
+    """Packs curves of different lengths into padded 2D arrays, so that all of them can be fitted at once
+
+    INPUT:
+        current_densities: list of (n_k,) arrays of the current density in mA cm^-2, positive for a fuel cell delivering current
+
+        potentials: list of (n_k,) arrays of the cell potential in V
+
+        min_current_density: samples below this current density (mA cm^-2) are not used, log10(i) of the Tafel term needs i > 0 (default 1.0)
+
+    OUTPUT:
+        current: (m, n) array of the current density in A cm^-2, padded and left out samples are NaN
+
+        potential: (m, n) array of the potential in V, padded samples are 0
+
+        weight: (m, n) array, 1 for samples used in the fit and 0 for padded or left out samples
+    """
+    number_of_curves = len(current_densities)
+    number_of_samples = max((len(current_density) for current_density in current_densities), default=0)
+
+    current = np.full((number_of_curves, number_of_samples), np.nan)
+    potential = np.zeros((number_of_curves, number_of_samples))
+    weight = np.zeros((number_of_curves, number_of_samples))
+
+    for k, (current_density, curve_potential) in enumerate(zip(current_densities, potentials)):
+        current_density = np.asarray(current_density, dtype=float)
+        curve_potential = np.asarray(curve_potential, dtype=float)
+        is_used = (current_density >= min_current_density) & np.isfinite(current_density) & np.isfinite(curve_potential)
+
+        n = len(current_density)
+        current[k, :n] = np.where(is_used, current_density / 1000, np.nan)
+        potential[k, :n] = np.where(is_used, curve_potential, 0.0)
+        weight[k, :n] = is_used
+
+    return current, potential, weight
+
+
+def get_model(theta, current, max_current):
+    """Returns the potential of the loss model and its analytic Jacobian, for all curves at once
+
+    E(i) = c0 - b log10(i) - ASR i + B ln(1 - i/i_lim),   with   c0 = E_rev + b log10(i0)   and   i_lim = i_max + exp(s)
+
+    The limiting current is parametrized by its margin s above the largest measured current, so the logarithm is always defined.
+
+    INPUT:
+        theta: (m, 5) array of the parameters [c0, b, ASR, B, s] of every curve
+
+        current: (m, n) array of the current density in A cm^-2
+
+        max_current: (m,) array of the largest used current density of every curve, in A cm^-2
+
+    OUTPUT:
+        model: (m, n) array of the potential in V
+
+        jacobian: (m, n, 5) array, the derivative of the potential with respect to every parameter
+    """
+    c0, b, ASR, B, s = (theta[:, j, None] for j in range(5))
+    margin = np.exp(s)
+    limiting_current = max_current[:, None] + margin
+
+    log_current = np.log10(current)
+    mass_transport = np.log1p(-current / limiting_current)
+
+    model = c0 - b * log_current - ASR * current + B * mass_transport
+
+    jacobian = np.empty(current.shape + (5,))
+    jacobian[..., 0] = 1.0
+    jacobian[..., 1] = -log_current
+    jacobian[..., 2] = -current
+    jacobian[..., 3] = mass_transport
+    jacobian[..., 4] = B * current / (limiting_current * (limiting_current - current)) * margin
+    return model, jacobian
+
+
+def get_initial_guess(current, potential, weight, max_current):
+    """Initial parameters: with the limiting current fixed at twice the largest current, the model is linear in
+    c0, b, ASR and B, which are then solved by weighted least squares for all curves at once"""
+    theta = np.zeros((current.shape[0], 5))
+    theta[:, 4] = np.log(max_current)
+
+    _, jacobian = get_model(theta, current, max_current)
+    basis = jacobian[..., :4] * weight[..., None]
+    normal_matrix = basis.transpose(0, 2, 1) @ basis + 1e-12 * np.eye(4)
+    theta[:, :4] = np.linalg.solve(normal_matrix, basis.transpose(0, 2, 1) @ (potential * weight)[..., None])[..., 0]
+    return theta
+
+
+def fit_curve_batch(current_densities, potentials, min_current_density=1.0, reversible_potential=REVERSIBLE_POTENTIAL, max_iterations=200, tolerance=1e-10):
+    """Fits the activation (Tafel), ohmic and mass-transport loss model to a batch of polarization curves at once,
+    with Levenberg-Marquardt steps on all curves in parallel
+
+    INPUT:
+        current_densities: list of (n_k,) arrays of the current density in mA cm^-2, positive for a fuel cell delivering current
+
+        potentials: list of (n_k,) arrays of the cell potential in V
+
+        min_current_density: samples below this current density (mA cm^-2) are not used (default 1.0)
+
+        reversible_potential: potential in V at which the exchange current density is defined (default 1.229)
+
+        max_iterations: maximum number of Levenberg-Marquardt steps (default 200)
+
+        tolerance: a curve has converged when its relative decrease of the sum of squares is below this (default 1e-10)
+
+    OUTPUT:
+        dict of (m,) arrays:
+            'exchange_current_density' in mA cm^-2
+            'Tafel_slope' in mV per decade
+            'ASR' (area specific resistance) in Ohm cm^2
+            'limiting_current_density' in mA cm^-2
+            'mass_transport_coefficient' B in V
+            'RMSE' in mV
+            'number_of_points' used in the fit
+            'iterations' and 'converged'
+    """
+    current, potential, weight = pack_curves(current_densities, potentials, min_current_density)
+    number_of_curves = current.shape[0]
+    number_of_points = weight.sum(axis=1)
+    if np.any(number_of_points < 5):
+        raise ValueError(f"Every curve needs at least 5 points above {min_current_density} mA cm^-2 to fit 5 parameters, got {number_of_points.astype(int).tolist()}")
+
+    max_current = np.nanmax(current, axis=1)
+    current = np.where(weight > 0, current, max_current[:, None]) # any current below the limiting current keeps the model finite where the weight is 0
+    theta = get_initial_guess(current, potential, weight, max_current)
+
+    model, jacobian = get_model(theta, current, max_current)
+    residual = (model - potential) * weight
+    cost = np.sum(residual**2, axis=1)
+    damping = np.full(number_of_curves, 1e-3)
+    iterations = np.zeros(number_of_curves, dtype=int)
+    converged = np.zeros(number_of_curves, dtype=bool)
+
+    for _ in range(max_iterations):
+        active = ~converged
+        if not active.any():
+            break
+
+        # damped Gauss-Newton step of every curve that has not converged: (J^T J + lambda diag(J^T J)) step = -J^T r
+        weighted_jacobian = jacobian[active] * weight[active, :, None]
+        normal_matrix = weighted_jacobian.transpose(0, 2, 1) @ weighted_jacobian
+        gradient = (weighted_jacobian.transpose(0, 2, 1) @ residual[active, :, None])[..., 0]
+        diagonal = np.einsum('mpp->mp', normal_matrix) + 1e-12
+        step = -np.linalg.solve(normal_matrix + (damping[active, None] * diagonal)[:, :, None] * np.eye(5), gradient[..., None])[..., 0]
+
+        trial_theta = theta[active] + step
+        trial_model, trial_jacobian = get_model(trial_theta, current[active], max_current[active])
+        trial_residual = (trial_model - potential[active]) * weight[active]
+        trial_cost = np.sum(trial_residual**2, axis=1)
+
+        # accept steps that lower the sum of squares and trust the linearization more, otherwise damp harder
+        is_better = np.isfinite(trial_cost) & (trial_cost < cost[active])
+        relative_decrease = np.where(is_better, (cost[active] - trial_cost) / np.maximum(cost[active], 1e-300), 0.0)
+
+        accepted = np.flatnonzero(active)[is_better]
+        theta[accepted] = trial_theta[is_better]
+        jacobian[accepted] = trial_jacobian[is_better]
+        residual[accepted] = trial_residual[is_better]
+        cost[accepted] = trial_cost[is_better]
+        damping[active] = np.where(is_better, damping[active] / 10, damping[active] * 10)
+        iterations[active] += 1
+
+        converged[np.flatnonzero(active)[is_better & (relative_decrease < tolerance)]] = True
+        converged[np.flatnonzero(active)[damping[active] > 1e12]] = True # no step lowers the sum of squares any more
+
+    c0, b, ASR, B, s = theta.T
+    return {
+        'exchange_current_density':   1000 * 10**((c0 - reversible_potential) / b),
+        'Tafel_slope':                1000 * b,
+        'ASR':                        ASR,
+        'limiting_current_density':   1000 * (max_current + np.exp(s)),
+        'mass_transport_coefficient': B,
+        'RMSE':                       1000 * np.sqrt(cost / number_of_points),
+        'number_of_points':           number_of_points.astype(int),
+        'iterations':                 iterations,
+        'converged':                  converged,
+    }
+
+
+def fit_polarization_curves(current_densities, potentials, processes=None, batch_size=64, **fit_options):
+    """Fits the loss model to many polarization curves, in batches of vectorized fits spread over a pool of processes
+
+    INPUT:
+        current_densities, potentials: lists of arrays, see fit_curve_batch
+
+        processes: number of worker processes, 1 fits in this process (default None, number of cores)
+
+        batch_size: number of curves fitted together in one vectorized fit (default 64)
+
+        fit_options: passed on to fit_curve_batch, e.g. min_current_density=5.0
+
+    OUTPUT:
+        dict of (m,) arrays in the order of the curves, see fit_curve_batch
+    """
+    batches = [(current_densities[start:start + batch_size], potentials[start:start + batch_size]) for start in range(0, len(current_densities), batch_size)]
+
+    if processes == 1 or len(batches) <= 1:
+        results = [fit_curve_batch(*batch, **fit_options) for batch in batches]
+    else:
+        import functools
+        import multiprocessing
+        with multiprocessing.Pool(processes=processes) as pool:
+            results = pool.starmap(functools.partial(fit_curve_batch, **fit_options), batches, chunksize=1)
+
+    if not results:
+        return {}
+    return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+
+def stack_curves(arrays):
+    """Stacks arrays of different lengths as the rows of one 2D float array, padded with NaN. Returns (array, lengths)"""
+    lengths = np.array([len(array) for array in arrays], dtype=int)
+    stacked = np.full((len(arrays), lengths.max(initial=0)), np.nan)
+    for k, array in enumerate(arrays):
+        stacked[k, :lengths[k]] = array
+    return stacked, lengths
+
+
+def compute_performance_metrics(current_densities, potentials, fixed_potentials=FIXED_POTENTIALS, potential_tolerance=0.0025, reversible_potential=REVERSIBLE_POTENTIAL):
+    """Computes the performance metrics of many polarization curves in one vectorized pass over all curves
+
+    INPUT:
+        current_densities: list of (n_k,) arrays of the current density in mA cm^-2, positive for a fuel cell delivering current
+
+        potentials: list of (n_k,) arrays of the cell potential in V
+
+        fixed_potentials: potentials in V at which the current density is reported (default (0.6, 0.7, 0.8))
+
+        potential_tolerance: the current density at a fixed potential is the mean of all samples (of all sweeps)
+                             within this distance in V of it, NaN if there are none (default 0.0025)
+
+        reversible_potential: potential in V that the voltage efficiency is relative to (default 1.229)
+
+    OUTPUT:
+        dict with
+            per sample, (m, n) arrays padded with NaN:
+                'current_density' in mA cm^-2, 'potential' in V, 'power_density' in mW cm^-2, 'voltage_efficiency' (E / E_rev)
+            per curve, (m,) arrays:
+                'length' (number of samples without the NaN padding at the end), 'max_power_density' in mW cm^-2 and the 'current_density_at_max_power' in mA cm^-2,
+                'potential_at_max_power' in V and 'voltage_efficiency_at_max_power' of the sample with the highest power density
+            per curve and fixed potential, (m, number of fixed potentials) array:
+                'current_density_at_fixed_potentials' in mA cm^-2, at the potentials in 'fixed_potentials'
+    """
+    current_density, _ = stack_curves(current_densities)
+    potential, _ = stack_curves(potentials)
+
+    # length of every curve without the NaN padding at its end, e.g. from a shorter column in the CSV-file
+    is_measured = ~np.isnan(current_density) & ~np.isnan(potential)
+    lengths = np.where(is_measured.any(axis=1), is_measured.shape[1] - np.argmax(is_measured[:, ::-1], axis=1), 0)
+
+    power_density = current_density * potential # mA cm^-2 V = mW cm^-2
+    voltage_efficiency = potential / reversible_potential
+
+    # maximum power point, NaN (padding or missing values) never wins
+    max_power_index = np.argmax(np.where(np.isnan(power_density), -np.inf, power_density), axis=1)[:, None]
+    max_power_density = np.take_along_axis(power_density, max_power_index, axis=1)[:, 0]
+
+    # current density at fixed potentials: mean over all samples close to every potential, for all curves and potentials at once
+    fixed_potentials = np.asarray(fixed_potentials, dtype=float)
+    is_close = np.abs(potential[:, :, None] - fixed_potentials) <= potential_tolerance
+    is_close &= ~np.isnan(current_density)[:, :, None]
+    summed_current_density = np.einsum('mn,mnt->mt', np.nan_to_num(current_density), is_close)
+    number_close = is_close.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        current_density_at_fixed_potentials = np.where(number_close > 0, summed_current_density / number_close, np.nan)
+
+    return {
+        'current_density':                     current_density,
+        'potential':                           potential,
+        'power_density':                       power_density,
+        'voltage_efficiency':                  voltage_efficiency,
+        'length':                              lengths,
+        'max_power_density':                   max_power_density,
+        'current_density_at_max_power':        np.take_along_axis(current_density, max_power_index, axis=1)[:, 0],
+        'potential_at_max_power':              np.take_along_axis(potential, max_power_index, axis=1)[:, 0],
+        'voltage_efficiency_at_max_power':     np.take_along_axis(voltage_efficiency, max_power_index, axis=1)[:, 0],
+        'fixed_potentials':                    fixed_potentials,
+        'current_density_at_fixed_potentials': current_density_at_fixed_potentials,
+    }
+
+
+def update_performance_metrics(state, current_density, potential, fixed_potentials=FIXED_POTENTIALS, potential_tolerance=0.0025, reversible_potential=REVERSIBLE_POTENTIAL):
+    """Updates the performance metrics of one polarization curve that is still being measured with its new samples.
+    Only the new samples are processed, and the metrics are the same as compute_performance_metrics of all samples so far
+
+    INPUT:
+        state: dict returned by the last update (default None for the first samples)
+
+        current_density, potential: (n,) arrays of the new samples, in mA cm^-2 and V
+
+        fixed_potentials, potential_tolerance, reversible_potential: as in compute_performance_metrics
+
+    OUTPUT:
+        (state, new_samples):
+            state: dict with the per curve metrics of compute_performance_metrics for this curve, 'length' being the
+                   number of samples so far, and the sums to continue the mean current density at the fixed potentials from
+            new_samples: dict with the 'power_density' and 'voltage_efficiency' of the new samples
+    """
+    current_density = np.asarray(current_density, dtype=float)
+    potential = np.asarray(potential, dtype=float)
+    fixed_potentials = np.asarray(fixed_potentials, dtype=float)
+    if state is None:
+        state = {'length': 0, 'max_power_density': np.nan, 'current_density_at_max_power': np.nan, 'potential_at_max_power': np.nan,
+                 'voltage_efficiency_at_max_power': np.nan, 'fixed_potentials': fixed_potentials,
+                 'summed_current_density': np.zeros(len(fixed_potentials)), 'number_close': np.zeros(len(fixed_potentials), dtype=int)}
+    state = dict(state, length=state['length'] + len(current_density))
+
+    power_density = current_density * potential # mA cm^-2 V = mW cm^-2
+    voltage_efficiency = potential / reversible_potential
+
+    # maximum power point, the first of equal maxima is kept and NaN never wins, like np.argmax in compute_performance_metrics
+    if np.any(~np.isnan(power_density)):
+        max_power_index = np.nanargmax(power_density)
+        if not power_density[max_power_index] <= state['max_power_density']: # also when the old maximum is NaN
+            state.update(max_power_density=power_density[max_power_index], current_density_at_max_power=current_density[max_power_index],
+                         potential_at_max_power=potential[max_power_index], voltage_efficiency_at_max_power=voltage_efficiency[max_power_index])
+
+    # running sums of the samples close to every fixed potential
+    is_close = (np.abs(potential[:, None] - fixed_potentials) <= potential_tolerance) & ~np.isnan(current_density)[:, None]
+    state['summed_current_density'] = state['summed_current_density'] + np.nan_to_num(current_density) @ is_close
+    state['number_close'] = state['number_close'] + is_close.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        state['current_density_at_fixed_potentials'] = np.where(state['number_close'] > 0, state['summed_current_density'] / state['number_close'], np.nan)
+
+    return state, {'power_density': power_density, 'voltage_efficiency': voltage_efficiency}
+
+# EOF #
@@ -0,0 +1,127 @@
+##===============================================##
+##        File: series_handler.py
+##      Author: GOTTFRID OLSSON
+##     Created: 2026-10-18
+##     Updated: 2026-10-18
+##       About: Compact measurement series: a dict
+##              with the name, the unit, the label
+##              of the sample and the values as one
+##              contiguous NumPy array (float64 or
+##              float32).
+##              Unit and area conversions are done
+##              in place, so a series is copied at
+##              most once from the DataFrame it was
+##              read from: when its dtype changes
+##              or when its values are first
+##              converted. Values that are a view
+##              of someone else's array are never
+##              changed in place.
+##              Useful functions:
+##               - from_column, make_series
+##               - convert_unit
+##               - divide_by_area
+##               - scale
+##===============================================##
+
+
+## LIBRARIES ##
+# numpy is imported in the functions that use it, so that importing this module stays fast
+
+## CONSTANTS ##
+SI_PREFIXES = {'': 1.0, 'k': 1e3, 'm': 1e-3, 'u': 1e-6, 'µ': 1e-6, 'n': 1e-9}
+BASE_UNITS = ('Ohm', 'A', 'V', 'W', 'C') # Ohm before the others, so that 'mOhm' is not read as a prefix
+
+
+## FUNCTIONS ##
+def make_series(values, name='', unit='', dtype=None, label=''):
+    """Makes a series of an array-like, without copying it if it already is a contiguous array of the dtype
+
+    INPUT:
+        values: array-like of numbers, e.g. a NumPy array, a pandas Series or a list
+
+        name: name of the series, e.g. the column header (default '')
+
+        unit: unit of the values, e.g. 'mA' or 'mA cm^-2' (default '')
+
+        dtype: dtype of the values, e.g. 'float32' to use half the memory of float64 (default None, float64)
+
+        label: the sample the series was measured on, e.g. 'fresh sample' (default '')
+
+    OUTPUT:
+        dict with 'name', 'unit', 'label', 'values' (1D contiguous NumPy array) and 'owned', True if the values were
+        allocated here. Values that are not owned may be a view of the caller's data and are copied before they are changed
+    """
+    import numpy as np
+
+    if hasattr(values, "to_numpy"): # pandas Series, a view of its values when the dtype is the same
+        values = values.to_numpy()
+    array = np.ascontiguousarray(values, dtype=np.float64 if dtype is None else dtype)
+    if array.ndim != 1:
+        raise ValueError(f"WARNING: a series must be one-dimensional, got shape {array.shape}")
+    owned = not isinstance(values, np.ndarray) or not np.may_share_memory(array, values)
+
+    return {'name': name, 'unit': unit, 'label': label, 'values': array, 'owned': owned}
+
+
+def from_column(DataFrame, column, unit='', dtype=None):
+    """Makes a series of a column of a DataFrame, by position (int) or name, as a view of the column if possible"""
+    if isinstance(column, str):
+        column = DataFrame.columns.get_loc(column)
+    return make_series(DataFrame.iloc[:, column], name=str(DataFrame.columns[column]), unit=unit, dtype=dtype)
+
+
+def get_writable_values(series):
+    """Returns the values of a series that can be changed in place, copying them only if the series does not own them
+    (a view of a DataFrame or of an array of the caller, which must not change) or they are read-only"""
+    import numpy as np
+
+    if not series.get('owned', False) or not series['values'].flags.writeable:
+        series['values'] = np.array(series['values'], order='C')
+        series['owned'] = True
+    return series['values']
+
+
+def scale(series, factor, unit=None):
+    """Multiplies the values of a series by factor in place, e.g. -1 to flip the sign. Returns the series
+
+    INPUT:
+        series: dict from make_series or from_column
+
+        factor: number to multiply every value with
+
+        unit: the new unit of the series (default None, unchanged)
+    """
+    import numpy as np
+
+    if factor != 1:
+        values = get_writable_values(series)
+        np.multiply(values, factor, out=values, casting='same_kind')
+    if unit is not None:
+        series['unit'] = unit
+    return series
+
+
+def split_unit(unit):
+    """Splits a unit like 'mA cm^-2' into its SI prefix factor, base unit and the rest: (1e-3, 'A', ' cm^-2')"""
+    for base_unit in BASE_UNITS:
+        for prefix, factor in SI_PREFIXES.items():
+            if unit.startswith(prefix + base_unit):
+                return factor, base_unit, unit[len(prefix + base_unit):]
+    raise ValueError(f"WARNING: unknown unit '{unit}', the unit must start with one of {BASE_UNITS} with an SI prefix in {list(SI_PREFIXES)}")
+
+
+def convert_unit(series, unit):
+    """Converts the values of a series to another SI prefix of the same unit in place, e.g. from 'mA' to 'A'. Returns the series"""
+    from_factor, from_base_unit, from_rest = split_unit(series['unit'])
+    to_factor, to_base_unit, to_rest = split_unit(unit)
+    if (from_base_unit, from_rest) != (to_base_unit, to_rest):
+        raise ValueError(f"WARNING: can not convert '{series['unit']}' to '{unit}', only the SI prefix can change")
+
+    return scale(series, from_factor / to_factor, unit)
+
+
+def divide_by_area(series, area, area_unit='cm^-2'):
+    """Divides the values of a series by the electrode area in place, e.g. from 'mA' to 'mA cm^-2'. Returns the series"""
+    return scale(series, 1 / area, (series['unit'] + ' ' + area_unit).strip())
+
+# EOF #